@@ -0,0 +1,46 @@
+"""Compara a validação antiga (texto inteiro em minúsculo a cada palavra-chave) com o ReportClassifier.
+
+Uso: python -m benchmarks.bench_classifier [tamanho_em_mb]
+"""
+import sys
+import time
+
+from services.report_classifier import FINANCIAL_KEYWORDS, MAIN_KEYWORDS, ReportClassifier
+from utils.secure_text import SecureText
+
+FILLER = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt.\n"
+ROW = "Maria da Silva | 123.456.789-00 | R$ 1.234,56 | 10/03/2025 | Em atraso | (11) 98765-4321\n"
+
+
+HEADER = "Nome | CPF | Valor | Vencimento | Status | Telefone\n"
+
+
+def build_pages(size_mb: float, row: str, header: str = "", rows_per_page: int = 50):
+    page_count = max(1, int(size_mb * 1024 * 1024 / (len(row) * rows_per_page)))
+    return [(number, header + row * rows_per_page) for number in range(page_count)]
+
+
+def old_validation(text: SecureText) -> bool:
+    report_text = text.text()
+    has_main_keywords = any(keyword.lower() in report_text.lower() for keyword in MAIN_KEYWORDS)
+    has_financial_context = any(keyword.lower() in report_text.lower() for keyword in FINANCIAL_KEYWORDS)
+    return has_main_keywords and has_financial_context
+
+
+def timed(label: str, func) -> float:
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed * 1000:9.2f} ms  ({result})")
+    return elapsed
+
+
+if __name__ == "__main__":
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    classifier = ReportClassifier()
+    # Relatório de verdade (a resposta sai na primeira página) e um PDF qualquer (precisa ler tudo)
+    for name, row, header in (("relatório", ROW, HEADER), ("sem palavras-chave", FILLER, "")):
+        with SecureText(build_pages(size_mb, row, header)) as text:
+            old = timed(f"{name}: lower() por palavra-chave", lambda: old_validation(text))
+            new = timed(f"{name}: ReportClassifier", lambda: classifier.is_report(t for _, t in text.pages()))
+            print(f"{'':<45} {old / new:9.1f}x mais rápido")
@@ -0,0 +1,41 @@
+"""Microbenchmarks de flet.security vs utils.crypto (chave derivada em cache).
+
+Uso: python -m benchmarks.bench_crypto [quantidade]
+"""
+import sys
+import time
+
+from flet.security import decrypt as flet_decrypt
+from flet.security import encrypt as flet_encrypt
+
+from utils.crypto import CryptoService
+
+SECRET_KEY = "benchmark-secret-key"
+
+
+def timed(label: str, func, count: int) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000:9.1f} ms  ({elapsed / count * 1000:.2f} ms/op)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    names = [f"Cliente {i}" for i in range(count)]
+    service = CryptoService(SECRET_KEY)
+
+    old_encrypted = []
+    new_encrypted = []
+    timed("flet.security.encrypt", lambda: old_encrypted.extend(flet_encrypt(n, SECRET_KEY) for n in names), count)
+    timed("CryptoService.encrypt_many", lambda: new_encrypted.extend(service.encrypt_many(names)), count)
+    timed("flet.security.decrypt", lambda: [flet_decrypt(e, SECRET_KEY) for e in new_encrypted], count)
+    timed("CryptoService.decrypt_many", lambda: service.decrypt_many(new_encrypted), count)
+    # Login: o mesmo password_hash é descriptografado a cada tentativa
+    stored = old_encrypted[0]
+    timed("flet.security.decrypt (mesmo hash)", lambda: [flet_decrypt(stored, SECRET_KEY) for _ in names], count)
+    timed("CryptoService.decrypt (mesmo hash)", lambda: [service.decrypt(stored) for _ in names], count)
+    # MessageManager.__init__ antes: 2 encrypt + 2 decrypt descartáveis; agora: nenhum
+    timed("round-trip antigo do MessageManager", lambda: [flet_decrypt(flet_encrypt(v, SECRET_KEY), SECRET_KEY)
+                                                          for v in ("sid", "token")], 1)
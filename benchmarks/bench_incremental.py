@@ -0,0 +1,95 @@
+"""Extração completa vs incremental de um relatório reemitido, conferindo que os clientes batem.
+
+Uso: python -m benchmarks.bench_incremental [páginas] [linhas por página]
+
+O relatório tem o cabeçalho da tabela só na primeira página, como os exportados pelos sistemas
+de cobrança; as demais páginas continuam a tabela. Cada cenário extrai a primeira versão pra
+formar o snapshot e depois a versão alterada, e compara com a extração completa da mesma versão.
+Tudo passa pelo parser local, então nenhuma chamada ao Claude é feita.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pymupdf as pp
+
+COLUMNS = (40, 120, 260, 340, 420, 500)
+HEADER = ("CPF", "Nome", "Valor", "Vencimento", "Status", "Telefone")
+
+
+class Page:
+    """Página do Flet só pros avisos do extrator, que aqui são ignorados."""
+
+    def open(self, *args):
+        pass
+
+    def update(self):
+        pass
+
+
+def cpf(number: int) -> str:
+    digits = [int(c) for c in f"{123456000 + number:09d}"]
+    for weight in (10, 11):
+        digits.append(sum(d * w for d, w in zip(digits, range(weight, 1, -1))) * 10 % 11 % 10)
+    return "".join(map(str, digits))
+
+
+def write_report(path: str, pages: int, rows: int, extra_on: int = None):
+    """Relatório com rows linhas por página e uma a mais na página extra_on."""
+    doc = pp.open()
+    number = 0
+    for page_number in range(pages):
+        page = doc.new_page()
+        y = 50
+        if page_number == 0:
+            for x, label in zip(COLUMNS, HEADER):
+                page.insert_text((x, y), label, fontsize=8)
+        for _ in range(rows + (page_number == extra_on)):
+            y += 16
+            values = (cpf(number), f"Cliente {number}", f"R$ {100 + number},00", "01/02/2025", "Em atraso",
+                      "(11) 91234-5678")
+            for x, value in zip(COLUMNS, values):
+                page.insert_text((x, y), value, fontsize=8)
+            number += 1
+    doc.save(path)
+
+
+def extract(path: str, user_key: str = None) -> tuple:
+    from services.pdf_extractor import PDFExtractor
+
+    extractor = PDFExtractor(path, Page(), user_key=user_key)
+    start = time.perf_counter()
+    clients = list(extractor.iter_pending_clients())
+    return sorted(client.name for client in clients), time.perf_counter() - start
+
+
+def run(label: str, directory: str, pages: int, rows: int, extra_on: int) -> bool:
+    before, after = os.path.join(directory, f"{label}_v1.pdf"), os.path.join(directory, f"{label}_v2.pdf")
+    write_report(before, pages, rows)
+    write_report(after, pages, rows, extra_on)
+    # Cada cenário num armazenamento próprio, pra que nem o snapshot nem o cache de resultados vazem
+    os.environ["FLET_APP_STORAGE_DATA"] = os.path.join(directory, label, "full")
+    full, full_time = extract(after)
+    os.environ["FLET_APP_STORAGE_DATA"] = os.path.join(directory, label, "incremental")
+    extract(before, user_key="bench")
+    incremental, incremental_time = extract(after, user_key="bench")
+    same = full == incremental
+    print(f"{label:<28} completa {len(full):5d} clientes {full_time * 1000:8.1f} ms  "
+          f"incremental {len(incremental):5d} clientes {incremental_time * 1000:8.1f} ms  iguais: {same}")
+    return same
+
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+    os.environ.setdefault("MY_APP_SECRET_KEY", "benchmark-secret-key")
+    with tempfile.TemporaryDirectory() as directory:
+        results = [
+            run("sem mudança", directory, pages, rows, None),
+            run("página do cabeçalho mudou", directory, pages, rows, 0),
+            run("só uma continuação mudou", directory, pages, rows, pages - 1),
+        ]
+    if not all(results):
+        sys.exit("Extração incremental divergiu da completa")
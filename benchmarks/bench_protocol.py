@@ -0,0 +1,52 @@
+"""Compara a saída em JSON com o protocolo de linhas (services.row_protocol) no mesmo corpus.
+
+Mede o tamanho da resposta (tokens de saída estimados, o que domina a latência do Claude) e o
+tempo de parse local.
+
+Uso: python -m benchmarks.bench_protocol [clientes]
+"""
+import json
+import random
+import sys
+import time
+
+from services.chunker import estimate_tokens
+from services.client_validator import validate_clients
+from services.row_protocol import format_rows, parse_rows
+
+
+def make_corpus(count: int) -> list:
+    rng = random.Random(42)
+    statuses = ("Em atraso", "Renegociado", "Pendente", "Vencido")
+    return [{
+        "id": f"{rng.randrange(10 ** 10, 10 ** 11)}",
+        "name": f"Cliente Exemplo {i}",
+        "debt_amount": round(rng.uniform(50, 5000), 2),
+        "due_date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+        "status": rng.choice(statuses),
+        "contact": f"(11) 9{rng.randrange(1000, 9999)}-{rng.randrange(1000, 9999)}",
+    } for i in range(count)]
+
+
+def measure(label: str, body: str, parse, rounds: int = 20) -> list:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        records = parse(body)
+    elapsed = (time.perf_counter() - start) / rounds
+    print(f"{label:<8} {len(body):9d} chars  ~{estimate_tokens(body):7d} tokens de saída  "
+          f"parse {elapsed * 1000:7.2f} ms")
+    return records
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    corpus = make_corpus(count)
+    # Mesmo formato que o Claude devolve: JSON indentado vs uma linha por cliente
+    json_body = json.dumps(corpus, ensure_ascii=False, indent=2)
+    rows_body = format_rows(corpus)
+
+    json_records = measure("json", json_body, json.loads)
+    rows_records = measure("rows", rows_body, parse_rows)
+    print(f"Redução de saída: {1 - estimate_tokens(rows_body) / estimate_tokens(json_body):.0%}")
+    same = len(validate_clients(json_records).accepted) == len(validate_clients(rows_records).accepted) == count
+    print(f"Mesmos {count} clientes aceitos pela validação: {same}")
@@ -0,0 +1,46 @@
+"""Compara o pipeline antigo (encrypt + 2x decrypt do relatório) com o SecureText em memória.
+
+Uso: python -m benchmarks.bench_secure_text [tamanho_em_mb]
+"""
+import sys
+import time
+
+from flet.security import decrypt, encrypt
+
+from utils.secure_text import SecureText
+
+SECRET_KEY = "benchmark-secret-key"
+
+
+def build_report(size_mb: float):
+    row = "Maria da Silva | 123.456.789-00 | R$ 1.234,56 | 10/03/2025 | Em atraso | (11) 98765-4321\n"
+    rows_per_page = 50
+    page_count = max(1, int(size_mb * 1024 * 1024 / (len(row) * rows_per_page)))
+    return [(number, row * rows_per_page) for number in range(page_count)]
+
+
+def bench_encrypted_round_trips(pages) -> float:
+    start = time.perf_counter()
+    encrypted = encrypt("\n".join(text for _, text in pages), SECRET_KEY)  # extract_text_from_pdf
+    decrypt(encrypted, SECRET_KEY).lower()  # validate_extracted_text
+    decrypt(encrypted, SECRET_KEY)  # extract_clients_with_claude
+    return time.perf_counter() - start
+
+
+def bench_secure_text(pages) -> float:
+    start = time.perf_counter()
+    with SecureText(pages) as text:
+        text.text().lower()
+        for _ in text.pages():
+            pass
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    pages = build_report(size_mb)
+    old = bench_encrypted_round_trips(pages)
+    new = bench_secure_text(pages)
+    print(f"Relatório de {size_mb} MB ({len(pages)} páginas)")
+    print(f"encrypt/decrypt: {old * 1000:.1f} ms")
+    print(f"SecureText:      {new * 1000:.1f} ms ({old / new:.0f}x mais rápido)")
@@ -0,0 +1,134 @@
+"""Latência por mensagem no Twilio com e sem pool de conexões, contra um servidor HTTPS local.
+
+Uso: python -m benchmarks.bench_twilio_pool [mensagens] [rtt_ms]
+
+O servidor imita o endpoint de criação de mensagens com TLS de verdade (certificado gerado na
+hora) e soma rtt_ms por ida e volta: duas no handshake (TCP + TLS) e uma por requisição, como
+numa conexão com a API real.
+"""
+import datetime
+import ipaddress
+import json
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+from services.provider_clients import create_pooled_http_client
+
+TWILIO_API = "https://api.twilio.com"
+
+
+def write_certificate(directory: str) -> str:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number()).not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), False)
+            .sign(key, hashes.SHA256()))
+    path = os.path.join(directory, "local.pem")
+    with open(path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    return path
+
+
+def start_server(cert_path: str, rtt: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Mantém a conexão aberta entre requisições
+        disable_nagle_algorithm = True  # Senão cabeçalho e corpo separados esperam o ACK atrasado do cliente
+
+        def setup(self):
+            time.sleep(2 * rtt)  # TCP + TLS
+            super().setup()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(rtt)
+            data = json.dumps({"sid": f"SM{uuid.uuid4().hex}", "status": "queued"}).encode()
+            self.send_response(201)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def local_client(http_client: TwilioHttpClient, base_url: str, cert_path: str) -> Client:
+    """Client do Twilio apontando pro servidor local, com a configuração HTTP recebida."""
+    request = http_client.request
+
+    def redirect(method, url, *args, **kwargs):
+        return request(method, url.replace(TWILIO_API, base_url), *args, **kwargs)
+
+    http_client.request = redirect
+    if http_client.session:
+        http_client.session.verify = cert_path
+    else:
+        os.environ["REQUESTS_CA_BUNDLE"] = cert_path  # Sem sessão, cada requisição cria a sua
+    return Client("ACbench", "token", http_client=http_client)
+
+
+def send(client: Client) -> float:
+    start = time.perf_counter()
+    client.messages.create(body="Olá", from_="whatsapp:+14155238886", to="whatsapp:+5511999999999")
+    return time.perf_counter() - start
+
+
+def report(label: str, latencies, elapsed: float):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<42} média {statistics.mean(latencies) * 1000:7.1f} ms  p50 {statistics.median(latencies) * 1000:7.1f} ms"
+          f"  p95 {p95 * 1000:7.1f} ms  total {elapsed:6.2f} s")
+
+
+def run(label: str, client_factory, count: int, concurrency: int = 1):
+    start = time.perf_counter()
+    if concurrency == 1:
+        latencies = [send(client_factory()) for _ in range(count)]
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            latencies = list(executor.map(lambda _: send(client_factory()), range(count)))
+    report(label, latencies, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path = write_certificate(directory)
+        server = start_server(cert_path, rtt)
+        base_url = f"https://127.0.0.1:{server.server_address[1]}"
+        print(f"{count} mensagens, RTT simulado {rtt * 1000:g} ms")
+
+        run("sem pool (conexão nova por mensagem)",
+            lambda: local_client(TwilioHttpClient(pool_connections=False), base_url, cert_path), count)
+        pooled = local_client(create_pooled_http_client(), base_url, cert_path)
+        run("pool compartilhado", lambda: pooled, count)
+        run("pool compartilhado, 4 simultâneas", lambda: pooled, count, concurrency=4)
+        server.shutdown()
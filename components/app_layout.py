@@ -5,13 +5,15 @@ import os
 
 import flet as ft
 from dotenv import load_dotenv
-from twilio.rest import Client
 
 from components.clients import create_clients_page
 from components.dialogs import create_dialogs
+from services.batch_ingestion import BatchIngestor, message_batch_enabled
 from services.message_manager import MessageManager
 from services.pdf_extractor import PDFExtractor
-from utils.message_templates import MessageTemplates
+from services.provider_clients import get_twilio_client
+from services.send_engine import SendEngine
+from utils.message_templates import MessageTemplates, TemplateError, compile_template
 from utils.supabase_utils import (fetch_plan_data, fetch_user_data,
                                   fetch_user_id, update_usage_data)
 from utils.theme_utils import get_current_color_scheme
@@ -125,10 +127,8 @@ def create_app_layout(page: ft.Page):
         local_messages_sent = user_data.get("messages_sent", 0)
         local_pdfs_processed = user_data.get("pdfs_processed", 0)
 
-    twilio_client = Client(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
+    twilio_client = get_twilio_client()
     support_number = os.getenv("SUPPORT_PHONE")
-    if not page.session.contains_key("notified_clients"):
-        page.session.set("notified_clients", [])
     message_templates = MessageTemplates()
     usage_display = ft.Text(
         f"Consumo: {local_messages_sent}/{message_limit} mensagens | {local_pdfs_processed}/{pdf_limit} PDFs",
@@ -153,6 +153,15 @@ def create_app_layout(page: ft.Page):
         color=current_color_scheme.on_surface
     )
     history = []
+    current_extractor = None  # PDFExtractor ou BatchIngestor em andamento, pro botão Cancelar
+    extraction_progress_bar = ft.ProgressBar(width=300, value=None, color=current_color_scheme.primary)
+    extraction_progress_text = ft.Text("", size=14, color=current_color_scheme.primary)
+    cancel_extraction_button = ft.TextButton("Cancelar", icon=ft.Icons.CANCEL, on_click=lambda e: cancel_extraction())
+    extraction_progress = ft.Row([
+        extraction_progress_bar,
+        extraction_progress_text,
+        cancel_extraction_button
+    ], alignment=ft.MainAxisAlignment.CENTER, spacing=10, visible=False)
 
     def sync_usage():
         nonlocal local_messages_sent, local_pdfs_processed
@@ -215,9 +224,7 @@ def create_app_layout(page: ft.Page):
         nonlocal selected_client
         selected_client = client
         current_color_scheme_ = get_current_color_scheme(page)
-        default_message = message_templates.get_template(message_templates.selected_template).format(
-            name=client.name, debt_amount=client.debt_amount, due_date=client.due_date, reason=client.reason if hasattr(client, 'reason') else "pendência")
-        message_input.value = default_message
+        message_input.value = message_templates.render(client)
         client_details = ft.ExpansionTile(
             title=ft.Text(f"{client.name}", size=18, weight=ft.FontWeight.BOLD, color=current_color_scheme_.primary),
             subtitle=ft.Text(f"Status: {client.status}", size=14, color=current_color_scheme_.on_surface),
@@ -299,10 +306,16 @@ def create_app_layout(page: ft.Page):
             return
         tile = next((t for t in client_list_view.controls if isinstance(
             t, ClientListTile) and t.client == client), None)
-        message_body = message_input.value if message_input.value else message_templates.get_template(message_templates.selected_template).format(
-            name=client.name, debt_amount=client.debt_amount, due_date=client.due_date, reason=client.reason if hasattr(client, 'reason') else "pendência")
-        await asyncio.sleep(1)
-        success = message_manager.send_single_notification(client, message_body)
+        message_body = message_input.value if message_input.value else message_templates.render(client)
+        # Passa pela fila de saída: se a cobrança de hoje já foi enviada, não manda de novo
+        entries = await asyncio.to_thread(message_manager.queue_notifications, user_id, [(client, message_body)], 1, True)
+        if not entries:
+            hide_dialog(loading_dialog)
+            CustomSnackBar(f"{client.name} já foi notificado hoje.").show(page)
+            return
+        # Requisição HTTP síncrona fora do loop do Flet, pra tela não travar durante o envio
+        success = await asyncio.to_thread(message_manager.send_queued, entries[0])
+        await asyncio.to_thread(message_manager.outbox.flush)
         if tile:
             tile.trailing = ft.Icon(ft.Icons.CHECK_CIRCLE if success else ft.Icons.ERROR,
                                     color=ft.Colors.GREEN if success else ft.Colors.ERROR)
@@ -312,11 +325,6 @@ def create_app_layout(page: ft.Page):
             last_sent = datetime.datetime.now().strftime("%d/%m/%Y %H:%M")
             history.append(type('HistoryEntry', (), {'sent_at': last_sent,
                            'status': 'enviado', 'message': message_body, 'client': client.name})())
-            notified_clients = page.session.get("notified_clients")
-            if client.name not in notified_clients:
-                notified_clients.append(client.name)
-                page.session.set("notified_clients", notified_clients)
-                logger.info(f"Cliente {client.name} notificado e adicionado à lista")
             CustomSnackBar(f"Alerta enviado para {client.name} às {last_sent}!").show(page)
             update_usage_dialog()
             usage_display.value = f"Consumo: {local_messages_sent}/{message_limit} mensagens | {local_pdfs_processed}/{pdf_limit} PDFs"
@@ -336,9 +344,34 @@ def create_app_layout(page: ft.Page):
             CustomSnackBar("Nenhum cliente carregado.", bgcolor=ft.Colors.ERROR).show(page)
             return
         remaining_messages = message_limit - local_messages_sent
-        notified_clients = page.session.get("notified_clients")
-        eligible_clients = [c for c in filtered_clients if c.name not in notified_clients]
-        clients_to_send = min(len(eligible_clients), remaining_messages)
+
+        # Modelo conferido uma vez e corpos gerados em lote, antes do primeiro envio
+        ready_clients, incomplete_clients = [], []
+        try:
+            template = compile_template(bulk_message_input.value)
+            for client in filtered_clients:
+                missing = template.missing_fields(client)
+                if missing:
+                    logger.warning(f"{client.name} fora do envio, sem: {', '.join(missing)}")
+                    incomplete_clients.append(client)
+                else:
+                    ready_clients.append(client)
+            outgoing = list(zip(ready_clients, template.render_many(ready_clients)))
+        except TemplateError as e:
+            logger.error(f"Modelo de envio em massa inválido: {e}")
+            CustomSnackBar(str(e), bgcolor=ft.Colors.ERROR, duration=5000).show(page)
+            return
+        if incomplete_clients:
+            CustomSnackBar(f"{len(incomplete_clients)} clientes ficaram de fora por falta de dados do modelo "
+                           f"({', '.join(c.name for c in incomplete_clients[:3])}"
+                           f"{'...' if len(incomplete_clients) > 3 else ''}).",
+                           bgcolor=ft.Colors.ERROR, duration=5000).show(page)
+
+        # A fila de saída pula quem já foi notificado hoje e retoma o que ficou de um envio interrompido
+        entries = []
+        if remaining_messages > 0:
+            entries = await asyncio.to_thread(message_manager.queue_notifications, user_id, outgoing, remaining_messages)
+        clients_to_send = len(entries)
         if clients_to_send <= 0:
             logger.info(
                 f"Sem mensagens disponíveis ou todos notificados: {local_messages_sent}/{message_limit}")
@@ -346,8 +379,9 @@ def create_app_layout(page: ft.Page):
             dialogs["usage_dialog"].open_dialog()
             await notify_limit_reached("messages")
             return
+        waiting_clients = await asyncio.to_thread(message_manager.outbox.pending_count, user_id)
         logger.info(
-            f"Enviando para {clients_to_send}/{len(eligible_clients)} clientes (restante: {remaining_messages})")
+            f"Enviando para {clients_to_send}/{clients_to_send + waiting_clients} clientes (restante: {remaining_messages})")
         dialogs["bulk_send_feedback_dialog"].dialog.modal = True
         dialogs["bulk_send_feedback_dialog"].open_dialog()
         total_clients = clients_to_send
@@ -357,87 +391,52 @@ def create_app_layout(page: ft.Page):
         dialogs["bulk_send_feedback"].controls.append(feedback_list)
         success_count = 0
         failed_count = 0
-        batch_size = 10  # Tamanho do lote
-        delay_between_batches = 30  # Delay em segundos entre lotes
+
+        # Taxa e envios simultâneos seguem o limite real do provedor (SEND_RATE_PER_SECOND, SEND_CONCURRENCY)
+        send_engine = SendEngine(message_manager.send_queued)
+        feedback_list.controls.append(
+            ft.Text(f"Enviando {clients_to_send} mensagens ({send_engine.rate:g}/s, "
+                    f"{send_engine.concurrency} simultâneas)...",
+                    weight=ft.FontWeight.BOLD,
+                    color=current_color_scheme.primary)
+        )
+        page.update()
 
         try:
-            for batch_start in range(0, clients_to_send, batch_size):
-                batch_end = min(batch_start + batch_size, clients_to_send)
-                current_batch = eligible_clients[batch_start:batch_end]
-                batch_number = (batch_start // batch_size) + 1
-                total_batches = (clients_to_send + batch_size - 1) // batch_size
-
-                feedback_list.controls.append(
-                    ft.Text(f"Enviando lote {batch_number} de {total_batches}...",
-                            weight=ft.FontWeight.BOLD,
-                            color=current_color_scheme.primary)
-                )
+            sent = 0
+            async for entry, success in send_engine.run(entries):
+                client, message_body = entry.client, entry.body
+                sent += 1
+                feedback_list.controls.append(ft.Row([
+                    ft.Text(f"{client.name} ({client.contact})",
+                            color=current_color_scheme.primary),
+                    ft.Icon(ft.Icons.CHECK_CIRCLE if success else ft.Icons.ERROR,
+                            color=ft.Colors.GREEN if success else ft.Colors.ERROR)
+                ]))
+
+                tile = next((t for t in client_list_view.controls if isinstance(
+                    t, ClientListTile) and t.client == client), None)
+                if tile:
+                    tile.trailing = ft.Icon(ft.Icons.CHECK_CIRCLE if success else ft.Icons.ERROR,
+                                            color=ft.Colors.GREEN if success else ft.Colors.ERROR)
+
+                if success:
+                    success_count += 1
+                    history.append(type('HistoryEntry', (), {
+                        'sent_at': datetime.datetime.now().strftime("%d/%m/%Y %H:%M"),
+                        'status': 'enviado',
+                        'message': message_body,
+                        'client': client.name
+                    })())
+                    logger.info(f"Sucesso para {client.name}, notificado")
+                else:
+                    failed_count += 1
+                    logger.error(f"Falha para {client.name}")
+
+                dialogs["progress_bar"].value = sent / total_clients
                 page.update()
 
-                for idx, client in enumerate(current_batch):
-                    logger.info(f"Enviando para {client.name} ({client.contact})")
-                    feedback_list.controls.append(
-                        ft.Text(f"Enviando para {client.name} ({client.contact})...",
-                                italic=True,
-                                color=current_color_scheme.primary)
-                    )
-                    page.update()
-
-                    try:
-                        message_body = bulk_message_input.value.format(
-                            name=client.name,
-                            debt_amount=client.debt_amount,
-                            due_date=client.due_date,
-                            reason=client.reason if hasattr(client, 'reason') else "pendência"
-                        )
-                    except KeyError as e:
-                        logger.error(f"Erro na formatação para {client.name}: {e}")
-                        message_body = f"Olá {client.name}, regularize sua pendência de {client.debt_amount} vencida em {client.due_date}."
-
-                    tile = next((t for t in client_list_view.controls if isinstance(
-                        t, ClientListTile) and t.client == client), None)
-
-                    success = message_manager.send_single_notification(client, message_body)
-                    feedback_list.controls[-1] = ft.Row([
-                        ft.Text(f"{client.name} ({client.contact})",
-                                color=current_color_scheme.primary),
-                        ft.Icon(ft.Icons.CHECK_CIRCLE if success else ft.Icons.ERROR,
-                                color=ft.Colors.GREEN if success else ft.Colors.ERROR)
-                    ])
-
-                    if tile:
-                        tile.trailing = ft.Icon(ft.Icons.CHECK_CIRCLE if success else ft.Icons.ERROR,
-                                                color=ft.Colors.GREEN if success else ft.Colors.ERROR)
-                        page.update()
-
-                    if success:
-                        success_count += 1
-                        notified_clients.append(client.name)
-                        page.session.set("notified_clients", notified_clients)
-                        history.append(type('HistoryEntry', (), {
-                            'sent_at': datetime.datetime.now().strftime("%d/%m/%Y %H:%M"),
-                            'status': 'enviado',
-                            'message': message_body,
-                            'client': client.name
-                        })())
-                        logger.info(f"Sucesso para {client.name}, notificado")
-                    else:
-                        failed_count += 1
-                        logger.error(f"Falha para {client.name}")
-
-                    dialogs["progress_bar"].value = (batch_start + idx + 1) / total_clients
-                    await asyncio.sleep(5)  # Delay entre mensagens individuais
-                    page.update()
-
-                if batch_end < clients_to_send:
-                    feedback_list.controls.append(
-                        ft.Text(f"Aguardando {delay_between_batches} segundos antes do próximo lote...",
-                                italic=True,
-                                color=current_color_scheme.primary)
-                    )
-                    page.update()
-                    await asyncio.sleep(delay_between_batches)
-
+            await asyncio.to_thread(message_manager.outbox.flush)
             last_sent_ = datetime.datetime.now().strftime("%d/%m/%Y %H:%M")
             increment_usage("messages_sent", success_count)
             feedback_list.controls.append(ft.Text(
@@ -461,16 +460,17 @@ def create_app_layout(page: ft.Page):
                                               size=12,
                                               color=current_color_scheme.primary)]
 
-            if len(eligible_clients) > clients_to_send:
-                logger.info(f"{len(eligible_clients) - clients_to_send} clientes não enviados por limite")
+            if waiting_clients:
+                logger.info(f"{waiting_clients} clientes não enviados por limite")
                 feedback_list.controls.append(ft.Text(
-                    f"Nota: {len(eligible_clients) - clients_to_send} clientes excederam o limite.",
+                    f"Nota: {waiting_clients} clientes excederam o limite e ficaram na fila.",
                     color=current_color_scheme.primary
                 ))
 
             update_usage_data(user_id, local_messages_sent, local_pdfs_processed, page)
 
         except Exception as e:
+            await asyncio.to_thread(message_manager.outbox.flush)
             logger.error(f"Erro no envio em massa: {e}")
             feedback_list.controls.append(ft.Text(f"Erro: {str(e)}", color=ft.Colors.ERROR))
             dialogs["bulk_send_feedback_dialog"].dialog.actions[0].disabled = False
@@ -509,8 +509,91 @@ def create_app_layout(page: ft.Page):
         page.close(dialog)
         page.update()
 
+    def on_extraction_progress(done, total, stage):
+        extraction_progress_bar.value = done / total if total else None
+        extraction_progress_text.value = f"{stage}: {done}/{total} | {len(clients_list)} clientes"
+        page.update()
+
+    def show_extraction_progress(visible: bool, cancellable: bool = True):
+        extraction_progress_bar.value = None
+        extraction_progress_text.value = "Lendo o relatório..."
+        extraction_progress.visible = visible
+        cancel_extraction_button.visible = cancellable
+        upload_button.disabled = visible
+        page.update()
+
+    def cancel_extraction():
+        if current_extractor:
+            current_extractor.cancel()
+            extraction_progress_text.value = "Cancelando..."
+            page.update()
+
+    def show_batch_report(result):
+        current_color_scheme_ = get_current_color_scheme(page)
+        status_colors = {"erro": ft.Colors.ERROR, "vazio": ft.Colors.YELLOW, "cancelado": ft.Colors.YELLOW}
+        rows = [ft.Row([
+            ft.Text(report.name, expand=True, overflow=ft.TextOverflow.ELLIPSIS, color=current_color_scheme_.on_surface),
+            ft.Text(report.status, color=status_colors.get(report.status, current_color_scheme_.primary)),
+            ft.Text(f"{report.clients} clientes | {report.duplicates} duplicados"
+                    + (f" | {report.message}" if report.message else ""), color=current_color_scheme_.on_surface)
+        ], spacing=10) for report in result.reports]
+        dialog = ft.AlertDialog(
+            title=ft.Text(f"Lote concluído: {len(result.clients)} clientes", size=20, weight=ft.FontWeight.BOLD),
+            content=ft.Column(rows, spacing=10, scroll=ft.ScrollMode.AUTO, height=300, width=600),
+            actions=[ft.TextButton("Fechar", on_click=lambda e: page.close(dialog))],
+            actions_alignment=ft.MainAxisAlignment.END
+        )
+        page.open(dialog)
+        page.update()
+
+    def process_pdf_batch(files):
+        nonlocal selected_client, current_page, current_extractor
+        pdf_paths = [f.path for f in files]
+        remaining_pdfs = pdf_limit - local_pdfs_processed
+        if len(pdf_paths) > remaining_pdfs:
+            logger.info(f"Lote de {len(pdf_paths)} PDFs limitado a {remaining_pdfs} pelo plano")
+            CustomSnackBar(f"Só {remaining_pdfs} de {len(pdf_paths)} PDFs cabem no limite do plano.",
+                           bgcolor=ft.Colors.YELLOW).show(page)
+            pdf_paths = pdf_paths[:remaining_pdfs]
+
+        def on_file_done(done, total, report):
+            extraction_progress_bar.value = done / total
+            extraction_progress_text.value = f"Arquivos: {done}/{total} | {report.name}: {report.status}"
+            page.update()
+
+        clients_list.clear()
+        filtered_clients.clear()
+        selected_client = None
+        current_page = 0
+        client_list_view.controls.clear()
+        messages_view.controls.clear()
+        show_extraction_progress(True)
+
+        ingestor = BatchIngestor(page, on_file_done=on_file_done)
+        current_extractor = ingestor
+        try:
+            result = ingestor.ingest(pdf_paths)
+            clients_list.extend(result.clients)
+            filtered_clients.extend(result.clients)
+            increment_usage("pdfs_processed", result.processed_count)
+            update_usage_data(user_id, local_messages_sent, local_pdfs_processed, page)
+            show_extraction_progress(False)
+            update_client_list()
+            show_batch_report(result)
+            usage_display.value = f"Consumo: {local_messages_sent}/{message_limit} mensagens | {local_pdfs_processed}/{pdf_limit} PDFs"
+            usage_display.color = get_current_color_scheme(page).primary
+        except Exception as e:
+            logger.error(f"Erro ao processar lote de PDFs: {e}")
+            CustomSnackBar(f"Ocorreu um erro no lote: {str(e)}.", bgcolor=ft.Colors.ERROR).show(page)
+            show_extraction_progress(False)
+            dialogs["error_dialog"].open_dialog()
+        finally:
+            current_extractor = None
+
+        page.update()
+
     def process_pdf(e: ft.FilePickerResultEvent):
-        nonlocal clients_list, filtered_clients, selected_client, current_page, local_pdfs_processed
+        nonlocal clients_list, filtered_clients, selected_client, current_page, local_pdfs_processed, current_extractor
         logger.info(f"Processando PDF: {e.files[0].path if e.files else 'Nenhum'}")
 
         if not e.files:
@@ -527,28 +610,46 @@ def create_app_layout(page: ft.Page):
             CustomSnackBar("Limite de PDFs atingido! Já avisei o suporte!", bgcolor=ft.Colors.YELLOW).show(page)
             return
 
-        extractor = PDFExtractor(pdf_path, page)
+        # No modo noturno até um PDF só vai pelo Message Batch
+        if len(e.files) > 1 or message_batch_enabled():
+            process_pdf_batch(e.files)
+            return
+
+        extractor = PDFExtractor(pdf_path, page, on_progress=on_extraction_progress, user_key=user_id)
+        current_extractor = extractor
         clients_list.clear()
         filtered_clients.clear()
-        loading_dialog = show_loading()
+        selected_client = None
+        current_page = 0
+        client_list_view.controls.clear()
+        messages_view.controls.clear()
+        show_extraction_progress(True)
 
         try:
-            extracted_data = extractor.extract_pending_data()
-            if not extracted_data:
+            # Os clientes entram na lista conforme cada página/chunk é confirmado
+            for client in extractor.iter_pending_clients():
+                clients_list.append(client)
+                filtered_clients.append(client)
+                # Redesenha enquanto a página visível enche e depois a cada 10 clientes, pra não travar a UI
+                if len(filtered_clients) <= clients_per_page or len(filtered_clients) % 10 == 0:
+                    update_client_list()
+
+            cancelled = extractor.cancel_event.is_set()
+            show_extraction_progress(False)
+            if cancelled:
+                logger.info(f"Extração cancelada com {len(clients_list)} clientes carregados")
+                CustomSnackBar(f"Extração cancelada. {len(clients_list)} clientes foram carregados.",
+                               bgcolor=ft.Colors.YELLOW).show(page)
+            elif not clients_list:
                 logger.warning("Nenhum cliente extraído.")
                 CustomSnackBar("Nenhum cliente válido encontrado no PDF. Verifique os dados e tente novamente.",
                                bgcolor=ft.Colors.YELLOW).show(page)
             else:
-                logger.info(f"Extraídos {len(extracted_data)} clientes!")
-                clients_list.extend(extracted_data)
-                filtered_clients.extend(clients_list)
-                CustomSnackBar(f"Sucesso! {len(extracted_data)} clientes foram carregados com êxito!").show(page)
-
-            selected_client = None
-            current_page = 0
-            client_list_view.controls.clear()
-            messages_view.controls.clear()
-            increment_usage("pdfs_processed")
+                logger.info(f"Extraídos {len(clients_list)} clientes!")
+                CustomSnackBar(f"Sucesso! {len(clients_list)} clientes foram carregados com êxito!").show(page)
+
+            if not extractor.from_cache:
+                increment_usage("pdfs_processed")
             update_usage_data(user_id, local_messages_sent, local_pdfs_processed, page)
             update_client_list()
             message_manager.generate_notifications(clients_list)
@@ -569,13 +670,13 @@ def create_app_layout(page: ft.Page):
                 )]
             )]
 
-            hide_dialog(loading_dialog)
-            success_dialog = show_success("PDF processado com sucesso!")
+            if not cancelled:
+                success_dialog = show_success("PDF processado com sucesso!")
 
-            async def delay_and_hide():
-                await asyncio.sleep(2)
-                hide_dialog(success_dialog)
-            page.run_task(delay_and_hide)
+                async def delay_and_hide():
+                    await asyncio.sleep(2)
+                    hide_dialog(success_dialog)
+                page.run_task(delay_and_hide)
 
             usage_display.value = f"Consumo: {local_messages_sent}/{message_limit} mensagens | {local_pdfs_processed}/{pdf_limit} PDFs"
             usage_display.color = current_color_scheme_.primary
@@ -584,8 +685,10 @@ def create_app_layout(page: ft.Page):
             logger.error(f"Erro ao processar PDF: {e}")
             CustomSnackBar(f"Ocorreu um erro: {str(e)}. Por favor, tente carregar outro PDF.",
                            bgcolor=ft.Colors.ERROR).show(page)
-            hide_dialog(loading_dialog)
+            show_extraction_progress(False)
             dialogs["error_dialog"].open_dialog()
+        finally:
+            current_extractor = None
 
         page.update()
 
@@ -607,18 +710,20 @@ def create_app_layout(page: ft.Page):
     c = get_current_color_scheme(page)
     messages_view.controls = [ft.Row(alignment=ft.MainAxisAlignment.CENTER, vertical_alignment=ft.CrossAxisAlignment.CENTER, controls=[ft.Column(horizontal_alignment=ft.CrossAxisAlignment.CENTER, alignment=ft.MainAxisAlignment.CENTER, expand=True, controls=[ft.Text(
         "Carregue um relatório de PDF para começar", size=20, weight=ft.FontWeight.BOLD, color=c.primary, text_align=ft.TextAlign.CENTER), ft.Text("Clique no botão acima para carregar um relatório", size=16, italic=True, color=c.primary_container, text_align=ft.TextAlign.CENTER)])])]
+    upload_button = ft.ElevatedButton("Carregar Relatório",
+                                      icon=ft.Icons.UPLOAD_FILE,
+                                      style=ft.ButtonStyle(
+                                          elevation=2,
+                                          shape=ft.RoundedRectangleBorder(radius=5),
+                                      ),
+                                      on_click=lambda _: file_picker.pick_files(allowed_extensions=["pdf"], allow_multiple=True)
+                                      )
     layout = ft.Column([
         ft.Row([
-            ft.ElevatedButton("Carregar Relatório",
-                              icon=ft.Icons.UPLOAD_FILE,
-                              style=ft.ButtonStyle(
-                                  elevation=2,
-                                  shape=ft.RoundedRectangleBorder(radius=5),
-                              ),
-                              on_click=lambda _: file_picker.pick_files(allowed_extensions=["pdf"])
-                              ),
+            upload_button,
             usage_display
         ], alignment=ft.MainAxisAlignment.SPACE_AROUND, spacing=10),
+        extraction_progress,
         create_clients_page(clients_list, filtered_clients, current_page, client_list_view,
                             messages_view, last_sent, dialogs, page, update_client_list)
     ], expand=True, alignment=ft.MainAxisAlignment.CENTER, spacing=20)
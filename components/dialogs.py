@@ -71,9 +71,7 @@ def create_dialogs(page, message_input, bulk_message_input, message_templates, u
         options=[ft.dropdown.Option(key) for key in message_templates.templates.keys()],
         value=message_templates.selected_template,
         on_change=lambda e: [message_templates.set_template(e.control.value),
-                             setattr(message_input, 'value', message_templates.get_template(e.control.value) if not selected_client else message_templates.get_template(e.control.value).format(
-                                 name=selected_client.name, debt_amount=selected_client.debt_amount,
-                                 due_date=selected_client.due_date, reason=getattr(selected_client, 'reason', 'pendência'))),
+                             setattr(message_input, 'value', message_templates.get_template(e.control.value) if not selected_client else message_templates.render(selected_client, e.control.value)),
                              logger.info(f"Modelo de mensagem individual alterado para: {e.control.value}"),
                              page.update()],
         width=300,
@@ -7,7 +7,7 @@ import random
 import smtplib
 from email.mime.text import MIMEText
 from time import sleep
-from flet.security import encrypt
+from utils.crypto import encrypt
 import re
 
 from utils.supabase_utils import write_supabase
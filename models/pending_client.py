@@ -9,6 +9,7 @@ class PendingClient:
     status: str
     contact: str
     reason: str = "pendência"
+    document: str = ""  # CPF/CNPJ só com dígitos; vazio quando o relatório não trouxe
 
     def format_whatsapp_message(self) -> str:
         return (f"Olá {self.name.split()[0]}, sua fatura de {self.debt_amount} "
@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import pymupdf as pp
+from dotenv import load_dotenv
+
+from models.pending_client import PendingClient
+from services.chunker import page_layout_text, page_table_text
+from services.dedup import ClientDeduplicator
+from services.extraction_cache import ExtractionCache
+from services.message_batch import MessageBatchCancelled, MessageBatchRunner
+from services.pdf_extractor import PDFExtractor
+from services.table_parser import LocalTableParser
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def message_batch_enabled() -> bool:
+    """Modo noturno ligado (MESSAGE_BATCH_MODE=1): vale pra um ou vários PDFs."""
+    return os.getenv("MESSAGE_BATCH_MODE", "0") == "1"
+
+
+def prepare_document(pdf_path: str, local_parser_enabled: bool = True, table_regions_only: bool = True) -> dict:
+    """Etapa de CPU (roda em outro processo): parser local e texto das páginas que vão pro Claude."""
+    try:
+        with pp.open(pdf_path) as doc:
+            parser = LocalTableParser() if local_parser_enabled else None
+            rows, fallback_pages, skipped_chars = [], [], 0
+            for page in doc:
+                page_rows = parser.parse_page(page) if parser else None
+                if page_rows is not None:
+                    rows.extend(page_rows)
+                elif table_regions_only:
+                    text, skipped = page_table_text(page)
+                    fallback_pages.append((page.number, text))
+                    skipped_chars += skipped
+                else:
+                    fallback_pages.append((page.number, page_layout_text(page)))
+            return {"rows": rows, "fallback_pages": fallback_pages, "page_count": doc.page_count,
+                    "skipped_chars": skipped_chars, "error": None}
+    except Exception as e:
+        return {"rows": [], "fallback_pages": [], "page_count": 0, "skipped_chars": 0, "error": str(e)}
+
+
+@dataclass
+class FileReport:
+    path: str
+    status: str = "pendente"  # processado, cache, duplicado, vazio, erro
+    clients: int = 0
+    duplicates: int = 0
+    message: str = ""
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+
+@dataclass
+class BatchResult:
+    clients: List[PendingClient] = field(default_factory=list)
+    reports: List[FileReport] = field(default_factory=list)
+
+    @property
+    def processed_count(self) -> int:
+        """Arquivos que consumiram processamento (cache não conta no limite do plano)."""
+        return sum(1 for report in self.reports if report.status in ("processado", "vazio"))
+
+
+class BatchIngestor:
+    """Processa vários PDFs: PyMuPDF num pool de processos e a etapa do Claude em paralelo por arquivo."""
+
+    def __init__(self, page, on_file_done: Optional[Callable[[int, int, FileReport], None]] = None,
+                 max_workers: int = None, file_concurrency: int = None, message_batch: bool = None,
+                 deduplicator: Optional[ClientDeduplicator] = None):
+        self.page = page
+        self.on_file_done = on_file_done
+        self.max_workers = max_workers or int(os.getenv("BATCH_PROCESS_WORKERS", "0")) or os.cpu_count() or 1
+        self.file_concurrency = file_concurrency or int(os.getenv("BATCH_FILE_CONCURRENCY", "3"))
+        self.deduplicator = deduplicator  # Compartilhado entre lotes da mesma sessão, se informado
+        # Modo noturno: todos os chunks de todos os PDFs vão num único Message Batch
+        self.message_batch = message_batch if message_batch is not None else message_batch_enabled()
+        self.cancel_event = threading.Event()
+        self._extractors: List[PDFExtractor] = []
+
+    def cancel(self):
+        """Interrompe a espera do Message Batch e as extrações em andamento."""
+        logger.info("Cancelamento do lote solicitado")
+        self.cancel_event.set()
+        for extractor in self._extractors:
+            extractor.cancel()
+
+    def ingest(self, pdf_paths: List[str]) -> BatchResult:
+        logger.info(f"Iniciando ingestão em lote de {len(pdf_paths)} PDFs")
+        reports: Dict[str, FileReport] = {path: FileReport(path=path) for path in pdf_paths}
+        results: Dict[str, List[PendingClient]] = {}
+        pending = []
+        seen_hashes = {}
+        done = 0
+
+        for path in pdf_paths:
+            extractor = PDFExtractor(path, self.page)
+            self._extractors.append(extractor)
+            if not extractor.validate_pdf_path():
+                reports[path].status, reports[path].message = "erro", "Arquivo inválido"
+                done += 1
+                self._file_done(done, len(pdf_paths), reports[path])
+                continue
+            pdf_hash = ExtractionCache.hash_file(path)
+            if pdf_hash in seen_hashes:
+                # Mesmo conteúdo com outro nome no mesmo lote: não paga a extração duas vezes
+                reports[path].status = "duplicado"
+                reports[path].message = f"Mesmo conteúdo de {os.path.basename(seen_hashes[pdf_hash])}"
+                done += 1
+                self._file_done(done, len(pdf_paths), reports[path])
+                continue
+            seen_hashes[pdf_hash] = path
+            cached_clients = extractor.result_cache.get(extractor.result_key(pdf_hash))
+            if cached_clients is not None:
+                results[path] = [PendingClient(**client) for client in cached_clients]
+                reports[path].status = "cache"
+                done += 1
+                self._file_done(done, len(pdf_paths), reports[path])
+            else:
+                pending.append((path, extractor, pdf_hash))
+
+        if pending:
+            paths = [path for path, _, _ in pending]
+            local_parser_enabled = pending[0][1].LOCAL_PARSER_ENABLED
+            table_regions_only = pending[0][1].TABLE_REGIONS_ONLY
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(paths))) as pool:
+                prepared = dict(zip(paths, pool.map(prepare_document, paths, [local_parser_enabled] * len(paths),
+                                                    [table_regions_only] * len(paths))))
+            if self.message_batch:
+                self._run_message_batch(pending, prepared)
+            if self.cancel_event.is_set():
+                for path, _, _ in pending:
+                    reports[path].status = "cancelado"
+                    done += 1
+                    self._file_done(done, len(pdf_paths), reports[path])
+                return self._merge(pdf_paths, results, reports)
+
+            with ThreadPoolExecutor(max_workers=max(1, self.file_concurrency)) as executor:
+                futures = {}
+                for path, extractor, pdf_hash in pending:
+                    if prepared[path]["error"]:
+                        reports[path].status, reports[path].message = "erro", prepared[path]["error"]
+                        done += 1
+                        self._file_done(done, len(pdf_paths), reports[path])
+                        continue
+                    futures[executor.submit(extractor.extract_prepared, prepared[path], pdf_hash)] = path
+
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        results[path] = future.result()
+                        if self.cancel_event.is_set():
+                            reports[path].status = "cancelado"
+                        else:
+                            reports[path].status = "processado" if results[path] else "vazio"
+                    except Exception as e:
+                        logger.error(f"Erro ao processar {path} no lote: {e}")
+                        reports[path].status, reports[path].message = "erro", str(e)
+                    done += 1
+                    self._file_done(done, len(pdf_paths), reports[path])
+
+        return self._merge(pdf_paths, results, reports)
+
+    def _run_message_batch(self, pending: list, prepared: Dict[str, dict]):
+        """Manda os chunks ainda sem cache de todos os PDFs num Message Batch e entrega as respostas aos extratores."""
+        requests = {}
+        for path, extractor, _ in pending:
+            if not prepared[path]["error"]:
+                requests.update(extractor.batch_requests(prepared[path]))  # Chunks iguais entre PDFs vão uma vez só
+        if not requests:
+            return
+        try:
+            responses = MessageBatchRunner(pending[0][1].client, cancel_event=self.cancel_event).run(requests)
+        except MessageBatchCancelled as e:
+            logger.info(f"{e}; os arquivos pendentes não serão processados")
+            return
+        except Exception as e:
+            # Sem o batch, cada chunk é enviado online na etapa seguinte
+            logger.error(f"Erro no Message Batch, seguindo com chamadas individuais: {e}")
+            return
+        for _, extractor, _ in pending:
+            extractor.batch_responses = responses
+
+    def _merge(self, pdf_paths: List[str], results: Dict[str, List[PendingClient]],
+               reports: Dict[str, FileReport]) -> BatchResult:
+        """Junta os clientes de todos os arquivos na ordem de entrada, sem duplicatas."""
+        merged = BatchResult()
+        deduplicator = self.deduplicator or ClientDeduplicator()
+        for path in pdf_paths:
+            for client in results.get(path, []):
+                if not deduplicator.is_new(client):
+                    reports[path].duplicates += 1
+                    continue
+                merged.clients.append(client)
+                reports[path].clients += 1
+            merged.reports.append(reports[path])
+        logger.info(f"Lote concluído: {len(merged.clients)} clientes únicos de {len(pdf_paths)} PDFs")
+        return merged
+
+    def _file_done(self, done: int, total: int, report: FileReport):
+        logger.info(f"Arquivo {report.name}: {report.status} {report.message}".strip())
+        if not self.on_file_done:
+            return
+        try:
+            self.on_file_done(done, total, report)
+        except Exception as e:
+            logger.warning(f"Erro no callback de progresso do lote: {e}")
@@ -0,0 +1,165 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from services.table_parser import group_lines, match_header, split_cells
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # Estimativa grosseira pra texto em português
+CELL_SEPARATOR = " | "
+CELL_SPLIT_PATTERN = re.compile(r"\s*\|\s*")
+COLUMN_TOLERANCE = 3.0  # Pontos de diferença aceitos entre bordas de coluna
+MIN_TABLE_LINES = 2  # Linhas alinhadas seguidas pra considerar uma região tabular
+
+
+@dataclass
+class Chunk:
+    index: int
+    text: str
+    pages: List[int] = field(default_factory=list)
+    has_table: bool = False
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def page_layout_text(page) -> str:
+    """Texto da página com uma linha por linha visual e células separadas por ' | '."""
+    lines = group_lines(page.get_text("words"))
+    return "\n".join(CELL_SEPARATOR.join(text for _, _, text in split_cells(line)) for line in lines)
+
+
+def _ruled_regions(page) -> List[Tuple[float, float]]:
+    """Faixas verticais (y0, y1) das tabelas com linhas de grade que o PyMuPDF encontra."""
+    if not hasattr(page, "find_tables"):
+        return []
+    try:
+        return [(table.bbox[1], table.bbox[3]) for table in page.find_tables().tables]
+    except Exception as e:
+        logger.debug(f"find_tables falhou na página {page.number}: {e}")
+        return []
+
+
+def _aligned(cells: list, previous: list) -> bool:
+    """Duas linhas são da mesma tabela se ao menos duas células começam ou terminam nas mesmas colunas."""
+    edges = [edge for x0, x1, _ in previous for edge in (x0, x1)]
+    matches = sum(1 for x0, x1, _ in cells
+                  if any(abs(x0 - edge) <= COLUMN_TOLERANCE or abs(x1 - edge) <= COLUMN_TOLERANCE for edge in edges))
+    return matches >= 2
+
+
+def page_table_text(page) -> Tuple[str, int]:
+    """Como page_layout_text, mas só com as regiões tabulares; retorna (texto, caracteres descartados).
+
+    Região tabular é o que está dentro de uma tabela com grade (find_tables) ou uma sequência de
+    pelo menos MIN_TABLE_LINES linhas com 3+ células alinhadas nas mesmas colunas. Capa, rodapé
+    legal e texto corrido ficam de fora. Se a página não tiver nenhuma região, vai inteira, pra
+    que listas sem formato de tabela ainda cheguem ao Claude.
+    """
+    word_lines = group_lines(page.get_text("words"))
+    lines = [split_cells(line) for line in word_lines]
+    texts = [CELL_SEPARATOR.join(text for _, _, text in cells) for cells in lines]
+    ruled = _ruled_regions(page)
+
+    keep = [False] * len(lines)
+    run: List[int] = []
+    for idx, cells in enumerate(lines + [[]]):  # Linha vazia no fim fecha a última sequência
+        if len(cells) >= 3 and (not run or _aligned(cells, lines[run[-1]])):
+            run.append(idx)
+            continue
+        if len(run) >= MIN_TABLE_LINES or any(is_header_line(texts[i]) for i in run):
+            for i in run:
+                keep[i] = True
+        run = [idx] if len(cells) >= 3 else []
+    for idx, words in enumerate(word_lines):
+        center = (words[0][1] + words[0][3]) / 2
+        if any(y0 <= center <= y1 for y0, y1 in ruled):
+            keep[idx] = True
+
+    full_text = "\n".join(texts)
+    if not any(keep):
+        return full_text, 0
+    kept_text = "\n".join(text for text, kept in zip(texts, keep) if kept)
+    return kept_text, len(full_text) - len(kept_text)
+
+
+def is_header_line(line: str) -> bool:
+    """Linha com pelo menos três rótulos de coluna conhecidos é tratada como cabeçalho de tabela."""
+    fields = {match_header(cell) for cell in CELL_SPLIT_PATTERN.split(line)}
+    fields.discard(None)
+    return len(fields) >= 3
+
+
+def build_chunks(pages: Iterable[Tuple[int, str]], max_tokens: int, max_rows: Optional[int] = None) -> Iterator[Chunk]:
+    """Agrupa páginas em chunks até o orçamento de tokens, cortando só entre páginas ou linhas.
+
+    Uma página só é quebrada se sozinha passar do orçamento. O cabeçalho da tabela em
+    vigor é repetido no início de cada chunk seguinte, pra que continuações não percam o contexto.
+    max_rows limita as linhas de dados por chunk, pra que a resposta esperada caiba no limite de saída.
+    """
+    index = 0
+    header: Optional[str] = None
+    lines: List[str] = []
+    chunk_pages: List[int] = []
+    tokens = 0
+    data_lines = 0
+
+    def make_chunk() -> Chunk:
+        text = "\n".join(lines)
+        return Chunk(index=index, text=text, pages=list(chunk_pages),
+                     has_table=header is not None or "Nome" in text)
+
+    def start_chunk() -> None:
+        nonlocal lines, chunk_pages, tokens, data_lines
+        lines = [header] if header else []
+        chunk_pages = []
+        tokens = estimate_tokens(header) if header else 0
+        data_lines = 0
+
+    for page_number, page_text in pages:
+        page_lines = [line for line in page_text.splitlines() if line.strip()]
+        if data_lines and (tokens + estimate_tokens(page_text) > max_tokens
+                           or (max_rows and data_lines + len(page_lines) > max_rows)):
+            yield make_chunk()
+            index += 1
+            start_chunk()
+
+        for line in page_lines:
+            if is_header_line(line):
+                # Tabela nova começa chunk novo, pra não misturar cabeçalhos
+                if data_lines:
+                    yield make_chunk()
+                    index += 1
+                header = line
+                start_chunk()
+                if page_number not in chunk_pages:
+                    chunk_pages.append(page_number)
+                continue
+
+            line_tokens = estimate_tokens(line)
+            if data_lines and (tokens + line_tokens > max_tokens or (max_rows and data_lines >= max_rows)):
+                yield make_chunk()
+                index += 1
+                start_chunk()
+            lines.append(line)
+            tokens += line_tokens
+            data_lines += 1
+            if page_number not in chunk_pages:
+                chunk_pages.append(page_number)
+
+    if data_lines:
+        yield make_chunk()
+
+
+def split_chunk(text: str) -> Optional[List[str]]:
+    """Divide um chunk ao meio pelas linhas de dados, repetindo o cabeçalho nas duas metades."""
+    lines = text.splitlines()
+    header = lines[:1] if lines and is_header_line(lines[0]) else []
+    data = lines[len(header):]
+    if len(data) < 2:
+        return None
+    middle = len(data) // 2
+    return ["\n".join(header + data[:middle]), "\n".join(header + data[middle:])]
@@ -0,0 +1,114 @@
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ("id", "name", "debt_amount", "due_date", "status", "contact")
+VALID_STATUSES = frozenset({"em atraso", "renegociado", "pendente", "vencido", "aberto"})
+
+ID_SEPARATORS = str.maketrans("", "", " .-/")
+DATE_PATTERN = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+NON_DIGIT_PATTERN = re.compile(r"\D")
+
+
+@dataclass
+class Rejection:
+    index: int
+    reason: str  # campos_incompletos, id_invalido, nome_invalido, valor_invalido, data_invalida, status_invalido, contato_invalido
+    value: str = ""
+
+
+@dataclass
+class ValidationReport:
+    accepted: List[dict] = field(default_factory=list)
+    rejected: List[Rejection] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, int]:
+        """Quantidade de rejeições por motivo."""
+        return dict(Counter(rejection.reason for rejection in self.rejected))
+
+    def log_summary(self) -> None:
+        logger.info(f"Validação: {len(self.accepted)} aceitos, {len(self.rejected)} rejeitados {self.summary()}")
+
+
+def validate_record(record) -> Tuple[Optional[dict], Optional[Tuple[str, str]]]:
+    """Valida e sanitiza um cliente; retorna (dados, None) ou (None, (motivo, valor))."""
+    if not isinstance(record, dict) or any(name not in record for name in REQUIRED_FIELDS):
+        return None, ("campos_incompletos", str(sorted(record) if isinstance(record, dict) else type(record).__name__))
+
+    # ID (CPF/CNPJ ou TEMP_XXX)
+    client_id = str(record["id"]).translate(ID_SEPARATORS)
+    if not (client_id.startswith("TEMP_") or (11 <= len(client_id) <= 14 and client_id.isdigit())):
+        return None, ("id_invalido", client_id)
+
+    name = str(record["name"]).strip()
+    if len(name) < 2:
+        return None, ("nome_invalido", name)
+
+    try:
+        debt_amount = float(str(record["debt_amount"]).replace("R$", "").replace(",", ".").strip())
+    except (ValueError, TypeError):
+        return None, ("valor_invalido", str(record["debt_amount"]))
+    if debt_amount <= 0:
+        return None, ("valor_invalido", str(record["debt_amount"]))
+
+    due_date = str(record["due_date"]).strip()
+    if due_date != "PENDENTE":
+        match = DATE_PATTERN.fullmatch(due_date)
+        try:
+            if not match:
+                raise ValueError(due_date)
+            datetime(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+        except ValueError:
+            return None, ("data_invalida", due_date)
+
+    status = str(record["status"]).strip().lower()
+    if status not in VALID_STATUSES:
+        return None, ("status_invalido", status)
+
+    digits = NON_DIGIT_PATTERN.sub("", str(record["contact"]))
+    if not 10 <= len(digits) <= 11:
+        return None, ("contato_invalido", str(record["contact"]))
+    split = 7 if len(digits) == 11 else 6
+    return {
+        "id": client_id,
+        "name": name,
+        "debt_amount": debt_amount,
+        "due_date": due_date,
+        "status": status.capitalize(),
+        "contact": f"({digits[:2]}) {digits[2:split]}-{digits[split:]}",
+        # Celular (compatível com WhatsApp/Twilio) tem 11 dígitos com 9 na frente
+        "twilio_compatible": len(digits) == 11 and digits[2] == "9",
+    }, None
+
+
+class ClientValidator:
+    """Valida clientes em lote acumulando um relatório estruturado, sem um log por registro."""
+
+    def __init__(self):
+        self.report = ValidationReport()
+        self._index = 0
+
+    def validate_one(self, record) -> Optional[dict]:
+        data, error = validate_record(record)
+        if data is None:
+            self.report.rejected.append(Rejection(self._index, *error))
+        else:
+            self.report.accepted.append(data)
+        self._index += 1
+        return data
+
+    def validate_many(self, records: Iterable) -> List[dict]:
+        """Valida a lista inteira numa passada e devolve só os aceitos."""
+        return [data for data in map(self.validate_one, records) if data is not None]
+
+
+def validate_clients(records: Iterable) -> ValidationReport:
+    """Valida todos os registros extraídos e devolve aceitos + rejeições."""
+    validator = ClientValidator()
+    validator.validate_many(records)
+    return validator.report
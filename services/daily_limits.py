@@ -0,0 +1,118 @@
+import datetime
+import logging
+import threading
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dotenv import load_dotenv
+
+from utils.storage import connect_sqlite, data_path
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+try:
+    BUSINESS_TZ = ZoneInfo("America/Sao_Paulo")
+except ZoneInfoNotFoundError:
+    # Windows sem o pacote tzdata; Brasília não tem horário de verão desde 2019
+    BUSINESS_TZ = datetime.timezone(datetime.timedelta(hours=-3), "America/Sao_Paulo")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_counts (
+    number TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (number, day)
+) WITHOUT ROWID;
+"""
+
+
+def local_day() -> str:
+    """Dia corrente (AAAA-MM-DD) no fuso de São Paulo, que é quando o limite diário vira."""
+    return datetime.datetime.now(BUSINESS_TZ).date().isoformat()
+
+
+def local_day_start() -> float:
+    """Timestamp da meia-noite de hoje em São Paulo."""
+    now = datetime.datetime.now(BUSINESS_TZ)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+class DailyLimitStore:
+    """Contador persistente de mensagens por (número, dia em São Paulo), em SQLite (WAL).
+
+    Conferir e ocupar uma vaga é um único UPSERT pela chave primária, atômico mesmo com vários
+    workers ou processos; dias anteriores são apagados uma vez na virada do dia, sem varrer os
+    números a cada consulta.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or data_path("daily_limits.sqlite3")
+        self._lock = threading.Lock()
+        self._day = None
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(SCHEMA)
+
+    def _today(self) -> str:
+        """Dia corrente; na virada apaga os contadores antigos. Chamar com o lock."""
+        day = local_day()
+        if day != self._day:
+            removed = self._conn.execute("DELETE FROM daily_counts WHERE day < ?", (day,)).rowcount
+            if removed:
+                logger.info(f"{removed} contadores diários de dias anteriores removidos")
+            self._day = day
+        return day
+
+    def reserve(self, number: str, limit: int) -> bool:
+        """Ocupa uma vaga do dia se o número ainda estiver abaixo do limite."""
+        if limit <= 0:
+            return False
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO daily_counts (number, day, count) VALUES (?, ?, 1) "
+                "ON CONFLICT(number, day) DO UPDATE SET count=count+1 WHERE count < ?",
+                (number, self._today(), limit))
+            return cursor.rowcount == 1
+
+    def increment(self, number: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO daily_counts (number, day, count) VALUES (?, ?, 1) "
+                "ON CONFLICT(number, day) DO UPDATE SET count=count+1", (number, self._today()))
+
+    def release(self, number: str):
+        """Devolve uma vaga ocupada por um envio que falhou."""
+        with self._lock:
+            self._conn.execute("UPDATE daily_counts SET count=count-1 WHERE number=? AND day=? AND count>0",
+                               (number, self._today()))
+
+    def count(self, number: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT count FROM daily_counts WHERE number=? AND day=?",
+                                     (number, self._today())).fetchone()
+            return row[0] if row else 0
+
+    def expire_old_days(self):
+        with self._lock:
+            self._day = None
+            self._today()
+
+    def close(self):
+        self._conn.close()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_daily_limit_store(path: str = None) -> DailyLimitStore:
+    """Retorna o contador compartilhado pelo processo pra esse arquivo (padrão: daily_limits.sqlite3).
+
+    Cada visita a /clients cria um MessageManager; todos usam a mesma conexão em vez de abrir
+    uma nova por visita.
+    """
+    path = path or data_path("daily_limits.sqlite3")
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = DailyLimitStore(path)
+        return _stores[path]
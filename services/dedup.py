@@ -0,0 +1,68 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, List, Set, Tuple
+
+NON_DIGIT_PATTERN = re.compile(r"\D")
+NON_WORD_PATTERN = re.compile(r"[^a-z0-9]+")
+DOCUMENT_LENGTHS = (11, 14)  # CPF e CNPJ
+
+
+def normalize_document(value) -> str:
+    """Só os dígitos do CPF/CNPJ; vazio pra IDs temporários ou inválidos."""
+    digits = NON_DIGIT_PATTERN.sub("", str(value or ""))
+    return digits if len(digits) in DOCUMENT_LENGTHS and not str(value).startswith("TEMP_") else ""
+
+
+def normalize_name(value) -> str:
+    """Minúsculo, sem acento e sem pontuação, pra comparar grafias diferentes do mesmo nome."""
+    text = unicodedata.normalize("NFKD", str(value or "")).encode("ascii", "ignore").decode("ascii")
+    return NON_WORD_PATTERN.sub(" ", text.lower()).strip()
+
+
+def _field(record, name: str):
+    return record.get(name) if isinstance(record, dict) else getattr(record, name, None)
+
+
+class ClientDeduplicator:
+    """Índice de clientes já vistos, reaproveitável entre chunks, páginas e PDFs da mesma sessão.
+
+    Com CPF/CNPJ a chave é documento + vencimento. Sem documento (TEMP_xxx), o nome é comparado
+    por similaridade só com os clientes do mesmo vencimento e telefone, então cada registro olha
+    um grupo pequeno e o custo total fica O(n). Aceita dicts (brutos ou validados) e PendingClient.
+    """
+
+    def __init__(self, name_threshold: float = 0.88):
+        self.name_threshold = name_threshold
+        self.duplicates = 0
+        self._documents: Set[Tuple[str, str]] = set()
+        self._names: Dict[Tuple[str, str], List[Tuple[str, bool]]] = {}
+
+    def is_new(self, record) -> bool:
+        """Registra o cliente e diz se ele ainda não tinha sido visto."""
+        document = normalize_document(_field(record, "document") or _field(record, "id"))
+        due_date = str(_field(record, "due_date") or "").strip()
+        name = normalize_name(_field(record, "name"))
+        bucket = self._names.setdefault((due_date, NON_DIGIT_PATTERN.sub("", str(_field(record, "contact") or ""))), [])
+
+        if document:
+            key = (document, due_date)
+            # Também é duplicata de um registro sem documento da mesma pessoa visto antes
+            if key in self._documents or self._matches(name, bucket, only_without_document=True):
+                self.duplicates += 1
+                return False
+            self._documents.add(key)
+        elif self._matches(name, bucket, only_without_document=False):
+            self.duplicates += 1
+            return False
+
+        bucket.append((name, bool(document)))
+        return True
+
+    def _matches(self, name: str, bucket: List[Tuple[str, bool]], only_without_document: bool) -> bool:
+        for seen_name, has_document in bucket:
+            if only_without_document and has_document:
+                continue
+            if seen_name == name or SequenceMatcher(None, seen_name, name).ratio() >= self.name_threshold:
+                return True
+        return False
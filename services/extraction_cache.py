@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from utils.crypto import get_crypto_service
+from utils.storage import data_path
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """Cache em disco, criptografado, de resultados de extração endereçados por hash."""
+
+    def __init__(self, namespace: str, max_entries: int = None, max_bytes: int = None, max_age_days: float = None):
+        self.directory = data_path("extraction_cache", namespace)
+        self.max_entries = max_entries or int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "200"))
+        self.max_bytes = max_bytes or int(os.getenv("EXTRACTION_CACHE_MAX_MB", "50")) * 1024 * 1024
+        self.max_age = (max_age_days or float(os.getenv("EXTRACTION_CACHE_MAX_AGE_DAYS", "30"))) * 86400
+        self.crypto = get_crypto_service()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """Calcula o SHA-256 do conteúdo do arquivo, independente do nome."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.cache")
+
+    def get(self, key: str):
+        """Retorna o valor guardado pra chave ou None se não existir/expirou."""
+        path = self._entry_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                logger.info(f"Entrada de cache expirada: {key[:12]}")
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.loads(self.crypto.decrypt(f.read()))
+            os.utime(path)  # Marca como usada recentemente pra eviction
+            logger.info(f"Cache hit: {key[:12]}")
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Entrada de cache inválida {key[:12]}, descartando: {e}")
+            self._remove(path)
+            return None
+
+    def set(self, key: str, value) -> None:
+        """Grava o valor criptografado e aplica a política de eviction."""
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # Único por escritor
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.crypto.encrypt(json.dumps(value, ensure_ascii=False)))
+            os.replace(tmp_path, path)
+            logger.info(f"Resultado gravado no cache: {key[:12]}")
+        except Exception as e:
+            logger.error(f"Erro ao gravar cache {key[:12]}: {e}")
+            self._remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove entradas expiradas e, depois, as menos usadas até caber nos limites."""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".cache"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total_bytes -= size
+            logger.info(f"Entrada removida do cache por limite: {os.path.basename(path)}")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class ChunkCache(ExtractionCache):
+    """Cache das respostas do Claude por chunk, com contadores de hit/miss."""
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None, max_age_days: float = None):
+        super().__init__("chunks", max_entries=max_entries or int(os.getenv("CHUNK_CACHE_MAX_ENTRIES", "2000")),
+                         max_bytes=max_bytes, max_age_days=max_age_days)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(prompt_version: str, model: str, chunk_text: str) -> str:
+        """Gera a chave a partir da versão do prompt, do modelo e do texto normalizado do chunk."""
+        normalized = " ".join(chunk_text.split())
+        return hashlib.sha256(f"{prompt_version}\x00{model}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        value = super().get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def stats(self) -> dict:
+        """Retorna os contadores de uso pra ajuste do cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
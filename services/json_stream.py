@@ -0,0 +1,66 @@
+import json
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+class JsonArrayStream:
+    """Parser incremental de um array JSON de objetos vindo em pedaços (streaming do Claude).
+
+    Cada objeto do primeiro nível é devolvido assim que a chave de fechamento chega, sem esperar
+    o fim da resposta. Texto antes do "[" (como a abertura do bloco ```json) é ignorado.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._current = []
+
+    def feed(self, delta: str) -> List[dict]:
+        """Consome mais um pedaço do texto e retorna os objetos completados nele."""
+        objects = []
+        for char in delta:
+            if self._finished:
+                break
+            if not self._started:
+                self._started = char == "["
+                continue
+            if self._depth == 0:
+                # Entre objetos do array: só interessa o início do próximo ou o fim do array
+                if char == "{":
+                    self._depth, self._current = 1, [char]
+                elif char == "]":
+                    self._finished = True
+                continue
+
+            self._current.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit("".join(self._current), objects)
+        return objects
+
+    @staticmethod
+    def _emit(text: str, objects: List[dict]):
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.debug(f"Objeto JSON inválido no streaming, ignorando: {e}")
+            return
+        if isinstance(value, dict):
+            objects.append(value)
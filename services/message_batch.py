@@ -0,0 +1,71 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUESTS_PER_BATCH = 100000  # Limite da API por Message Batch
+
+
+class MessageBatchCancelled(Exception):
+    """O usuário cancelou enquanto o Message Batch ainda era processado."""
+
+
+class MessageBatchRunner:
+    """Envia vários pedidos como Message Batches, espera terminarem e devolve as mensagens por custom_id.
+
+    Pensado pro processamento noturno: troca latência por custo e vazão. Aponte ANTHROPIC_BASE_URL
+    pro utils.local_batch_server pra rodar sem rede.
+    """
+
+    def __init__(self, client, poll_interval: float = None, timeout: float = None,
+                 cancel_event: Optional[threading.Event] = None):
+        self.client = client
+        self.cancel_event = cancel_event or threading.Event()  # Setado pela UI pra parar a espera
+        self.poll_interval = poll_interval or float(os.getenv("MESSAGE_BATCH_POLL_SECONDS", "30"))
+        self.timeout = timeout or float(os.getenv("MESSAGE_BATCH_TIMEOUT_HOURS", "24")) * 3600
+
+    def run(self, requests: Dict[str, dict]) -> Dict[str, object]:
+        """Recebe custom_id -> params do messages.create; retorna custom_id -> Message dos pedidos bem-sucedidos."""
+        if not requests:
+            return {}
+        items = [{"custom_id": custom_id, "params": params} for custom_id, params in requests.items()]
+        batch_ids = []
+        for start in range(0, len(items), MAX_REQUESTS_PER_BATCH):
+            batch = self.client.messages.batches.create(requests=items[start:start + MAX_REQUESTS_PER_BATCH])
+            logger.info(f"Message batch {batch.id} criado com {len(items[start:start + MAX_REQUESTS_PER_BATCH])} pedidos")
+            batch_ids.append(batch.id)
+
+        messages = {}
+        for batch_id in batch_ids:
+            self._wait(batch_id)
+            failed = 0
+            for entry in self.client.messages.batches.results(batch_id):
+                if entry.result.type == "succeeded":
+                    messages[entry.custom_id] = entry.result.message
+                else:
+                    failed += 1
+                    logger.warning(f"Pedido {entry.custom_id[:12]} do batch {batch_id} terminou como {entry.result.type}")
+            logger.info(f"Message batch {batch_id} concluído, {failed} pedidos sem resultado")
+        return messages
+
+    def _wait(self, batch_id: str):
+        deadline = time.monotonic() + self.timeout
+        batch = self.client.messages.batches.retrieve(batch_id)
+        while batch.processing_status != "ended":
+            if self.cancel_event.is_set():
+                self.client.messages.batches.cancel(batch_id)
+                raise MessageBatchCancelled(f"Message batch {batch_id} cancelado")
+            if time.monotonic() > deadline:
+                self.client.messages.batches.cancel(batch_id)
+                raise TimeoutError(f"Message batch {batch_id} não terminou no tempo limite")
+            counts = batch.request_counts
+            logger.info(f"Message batch {batch_id}: {counts.processing} em processamento, {counts.succeeded} prontos")
+            self.cancel_event.wait(self.poll_interval)  # Acorda na hora se cancelarem
+            batch = self.client.messages.batches.retrieve(batch_id)
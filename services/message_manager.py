@@ -1,15 +1,16 @@
-import datetime
 import logging
 import os
-from typing import List
+from typing import Iterable, List, Optional, Tuple
 
 import flet as ft
 from dotenv import load_dotenv
-from flet.security import decrypt, encrypt
-from twilio.rest import Client
 
 from models.pending_client import PendingClient
+from services.daily_limits import get_daily_limit_store, local_day
+from services.outbox import OutboxEntry, get_message_outbox
+from services.provider_clients import get_twilio_client
 from utils.database import add_notification, save_notification
+from utils.message_templates import compile_template
 
 load_dotenv()
 
@@ -18,21 +19,20 @@ logger = logging.getLogger(__name__)
 
 class MessageManager:
     def __init__(self, page=None):
-        secret_key = os.getenv("MY_APP_SECRET_KEY")
-        encrypted_sid = encrypt(os.getenv("TWILIO_ACCOUNT_SID"), secret_key)
-        encrypted_token = encrypt(os.getenv("TWILIO_AUTH_TOKEN"), secret_key)
-        self.TWILIO_ACCOUNT_SID = decrypt(encrypted_sid, secret_key)
-        self.TWILIO_AUTH_TOKEN = decrypt(encrypted_token, secret_key)
+        self.TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+        self.TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
         self.TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")
-        self.client = Client(self.TWILIO_ACCOUNT_SID, self.TWILIO_AUTH_TOKEN)
-        self.daily_limits = {}  # Controle de mensagens por número por dia
+        self.client = get_twilio_client(self.TWILIO_ACCOUNT_SID, self.TWILIO_AUTH_TOKEN)  # Compartilhado entre sessões
+        self.daily_limits = get_daily_limit_store()  # Mensagens por número por dia, compartilhado e persistido
         self.notified_numbers = set()  # Conjunto para controlar números já notificados sobre limite
         self.MAX_DAILY_MESSAGES = 1  # Limite diário por número
         self.page = page
+        self.outbox = get_message_outbox()  # Registro durável do que foi enviado, compartilhado entre sessões
 
     def show_limit_warning(self, client_number, client_name):
-        if client_number not in self.notified_numbers:
-            self.notified_numbers.add(client_number)
+        key = (client_number, local_day())  # Avisa de novo depois da virada do dia
+        if key not in self.notified_numbers:
+            self.notified_numbers.add(key)
             snackbar = ft.SnackBar(
                 content=ft.Text(
                     f"Limite diário excedido para {client_name} ({client_number}). Próxima tentativa após meia-noite.",
@@ -48,58 +48,71 @@ class MessageManager:
                 self.page.update()
 
     def reset_daily_limits(self):
-        """Reseta os limites diários e o conjunto de números notificados"""
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        for number, data in self.daily_limits.items():
-            if data["date"] != today:
-                self.daily_limits[number] = {"date": today, "count": 0}
+        """Apaga os contadores de dias anteriores e o conjunto de números notificados"""
+        self.daily_limits.expire_old_days()
         self.notified_numbers.clear()  # Limpa o conjunto de números notificados
 
     def check_daily_limit(self, phone_number):
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        if phone_number not in self.daily_limits:
-            self.daily_limits[phone_number] = {"date": today, "count": 0}
-
-        if self.daily_limits[phone_number]["date"] != today:
-            self.daily_limits[phone_number] = {"date": today, "count": 0}
-            if phone_number in self.notified_numbers:
-                self.notified_numbers.remove(phone_number)
-
-        return self.daily_limits[phone_number]["count"] < self.MAX_DAILY_MESSAGES
+        return self.daily_limits.count(phone_number) < self.MAX_DAILY_MESSAGES
 
     def increment_daily_count(self, phone_number):
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        if phone_number not in self.daily_limits:
-            self.daily_limits[phone_number] = {"date": today, "count": 0}
+        self.daily_limits.increment(phone_number)
 
-        if self.daily_limits[phone_number]["date"] != today:
-            self.daily_limits[phone_number] = {"date": today, "count": 0}
+    def reserve_daily_slot(self, phone_number) -> bool:
+        """Confere e já ocupa a vaga do dia de forma atômica; devolva com release_daily_slot se o envio falhar."""
+        return self.daily_limits.reserve(phone_number, self.MAX_DAILY_MESSAGES)
 
-        self.daily_limits[phone_number]["count"] += 1
+    def release_daily_slot(self, phone_number):
+        self.daily_limits.release(phone_number)
 
     def generate_notifications(self, clients: List[PendingClient]) -> None:
         for client in clients:
             print(client.format_whatsapp_message())
 
     def send_all_notifications(self, clients: List[PendingClient], custom_message=None) -> None:
-        for client in clients:
-            self.send_single_notification(client, custom_message)
+        # Modelo conferido e renderizado pra lista toda antes do primeiro envio
+        bodies = (compile_template(custom_message).render_many(clients) if custom_message
+                  else [client.format_whatsapp_message() for client in clients])
+        for client, message_body in zip(clients, bodies):
+            self._deliver(client, message_body)
+
+    def queue_notifications(self, user_key: str, items: Iterable[Tuple[PendingClient, str]], limit: int,
+                            only_these: bool = False) -> List[OutboxEntry]:
+        """Enfileira (cliente, corpo) e reserva até limit mensagens pra enviar agora.
+
+        Cobranças já enviadas hoje são puladas; sem only_these, sobras de um envio interrompido
+        desse usuário entram primeiro.
+        """
+        keys = self.outbox.enqueue_many(user_key, items)
+        return self.outbox.lease(user_key, limit, keys if only_these else None)
+
+    def send_queued(self, entry: OutboxEntry) -> bool:
+        """Envia uma mensagem reservada na fila e registra o resultado."""
+        success, detail = self._deliver(entry.client, entry.body)
+        if success:
+            self.outbox.ack(entry, detail)
+        else:
+            # Limite de taxa é passageiro: a mensagem volta pra fila; o resto fica como falha
+            self.outbox.fail(entry, detail, retry=detail == "Falha: Limite de taxa excedido")
+        return success
 
     def send_single_notification(self, client: PendingClient, custom_message=None) -> bool:
+        message_body = compile_template(custom_message).render(client) if custom_message else client.format_whatsapp_message()
+        return self._deliver(client, message_body)[0]
+
+    def _deliver(self, client: PendingClient, message_body: str) -> Tuple[bool, Optional[str]]:
+        """Envia o corpo já pronto pelo Twilio; devolve (sucesso, SID ou status da falha)."""
         raw_number = ''.join(filter(str.isdigit, client.contact))
         if len(raw_number) in [10, 11]:
             client_number = f"whatsapp:+55{raw_number}" if len(raw_number) == 11 else f"whatsapp:+5511{raw_number}"
 
-            # Verifica limite diário
-            if not self.check_daily_limit(client_number):
+            # Verifica e reserva o limite diário
+            if not self.reserve_daily_slot(client_number):
                 logger.warning(f"Limite diário excedido para {client.name} ({client_number})")
-                add_notification(client.name, custom_message if custom_message else client.format_whatsapp_message(),
-                                 "Falha: Limite diário de mensagens excedido")
+                add_notification(client.name, message_body, "Falha: Limite diário de mensagens excedido")
                 self.show_limit_warning(client_number, client.name)
-                return False
+                return False, "Falha: Limite diário de mensagens excedido"
 
-            message_body = (custom_message.format(name=client.name.split()[0], debt_amount=client.debt_amount,
-                                                  due_date=client.due_date) if custom_message else client.format_whatsapp_message())
             try:
                 message = self.client.messages.create(
                     body=message_body,
@@ -109,28 +122,29 @@ class MessageManager:
                 if message.sid:
                     logger.info(f"Mensagem enviada para {client.name}: SID {message.sid}")
                     add_notification(client.name, message_body, "Success", message.sid)
-                    self.increment_daily_count(client_number)
-                    return True
+                    return True, message.sid
+                self.release_daily_slot(client_number)
                 logger.error(f"Falha ao enviar para {client.name}: SID não retornado")
                 add_notification(client.name, message_body, "Falha: SID não retornado")
-                return False
+                return False, "Falha: SID não retornado"
             except Exception as e:
+                self.release_daily_slot(client_number)
                 error_message = str(e)
                 if "invalid phone number" in error_message.lower():
                     logger.error(f"Número inválido para {client.name}: {client.contact}")
-                    add_notification(client.name, message_body, "Falha: Número inválido")
+                    status = "Falha: Número inválido"
                 elif "rate limit" in error_message.lower():
                     logger.error(f"Limite de taxa excedido para {client.name}")
-                    add_notification(client.name, message_body, "Falha: Limite de taxa excedido")
+                    status = "Falha: Limite de taxa excedido"
                 elif "blocked" in error_message.lower():
                     logger.error(f"Número bloqueado para {client.name}")
-                    add_notification(client.name, message_body, "Falha: Número bloqueado")
+                    status = "Falha: Número bloqueado"
                 else:
                     logger.error(f"Erro ao enviar mensagem para {client.name}: {error_message}")
-                    add_notification(client.name, message_body, f"Falha: {error_message}")
-                return False
+                    status = f"Falha: {error_message}"
+                add_notification(client.name, message_body, status)
+                return False, status
         else:
             logger.error(f"Número inválido para {client.name}: {client.contact}")
-            add_notification(client.name, message_body if custom_message else client.format_whatsapp_message(),
-                             "Falha: Número inválido")
-            return False
+            add_notification(client.name, message_body, "Falha: Número inválido")
+            return False, "Falha: Número inválido"
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from models.pending_client import PendingClient
+from services.daily_limits import local_day, local_day_start
+from utils.crypto import get_crypto_service
+from utils.storage import connect_sqlite, data_path
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PENDING, LEASED, SENT, FAILED = "pending", "leased", "sent", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    user_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    sid TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_user_status ON outbox (user_key, status, created_at);
+"""
+
+
+@dataclass
+class OutboxEntry:
+    key: str
+    client: PendingClient
+    body: str
+    attempts: int = 0
+
+
+class MessageOutbox:
+    """Fila de saída em SQLite (WAL): cada mensagem é enfileirada, reservada, enviada e confirmada.
+
+    A chave é o hash de usuário + cliente + dívida + dia, então enfileirar de novo depois de um
+    fechamento no meio do envio não duplica nada: o que já foi confirmado é pulado e o resto volta
+    pra fila. Reservas são gravadas num commit só por lote; confirmações ficam num buffer e vão pro
+    disco a cada flush_every resultados ou flush_seconds. Uma reserva que expira sem confirmação
+    (processo morreu entre o envio e o flush) é reenviada, ou seja, a entrega é pelo menos uma vez.
+    """
+
+    def __init__(self, path: str = None, lease_seconds: float = None, max_attempts: int = None,
+                 flush_every: int = None, flush_seconds: float = None):
+        self.path = path or data_path("outbox.sqlite3")
+        self.lease_seconds = lease_seconds or float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+        self.max_attempts = max_attempts or int(os.getenv("OUTBOX_MAX_ATTEMPTS", "3"))
+        self.flush_every = flush_every or int(os.getenv("OUTBOX_FLUSH_EVERY", "20"))
+        self.flush_seconds = flush_seconds or float(os.getenv("OUTBOX_FLUSH_SECONDS", "1"))
+        self.crypto = get_crypto_service()
+        self._lock = threading.Lock()
+        self._results = []  # Confirmações ainda não gravadas: (status, sid, error, updated_at, key)
+        self._last_flush = time.monotonic()
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def message_key(user_key: str, client: PendingClient, day: str = None) -> str:
+        """Identifica a cobrança do dia, independente do texto da mensagem."""
+        day = day or local_day()
+        contact = "".join(filter(str.isdigit, client.contact or ""))
+        parts = (str(user_key), contact, client.name, str(client.debt_amount), str(client.due_date), day)
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _transaction(self):
+        """Transação que já pega o lock de escrita no BEGIN, então o que é lido nela não muda até o COMMIT."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def enqueue_many(self, user_key: str, items: Iterable[Tuple[PendingClient, str]]) -> List[str]:
+        """Enfileira (cliente, corpo) num commit só; o que já existe não é duplicado.
+
+        O que ainda está na fila ou falhou antes passa a usar o corpo novo; mensagens já
+        enviadas ou reservadas por um envio em andamento ficam como estão.
+        """
+        now = time.time()
+        rows, keys = [], []
+        for client, body in items:
+            key = self.message_key(user_key, client)
+            payload = self.crypto.encrypt(json.dumps({"client": asdict(client), "body": body}, ensure_ascii=False))
+            rows.append((key, str(user_key), payload, PENDING, now, now))
+            keys.append(key)
+        with self._lock:
+            self._flush_locked()
+            with self._transaction():
+                self._conn.executemany(
+                    "INSERT INTO outbox (key, user_key, payload, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET payload=excluded.payload, status='pending', attempts=0, "
+                    "error=NULL, updated_at=excluded.updated_at WHERE outbox.status IN ('pending', 'failed')", rows)
+        return keys
+
+    def lease(self, user_key: str, limit: int, keys: Iterable[str] = None) -> List[OutboxEntry]:
+        """Reserva até limit mensagens pendentes (ou com reserva vencida), mais antigas primeiro.
+
+        Sem keys, inclui o que sobrou de execuções anteriores desse usuário no mesmo dia; sobras
+        de dias anteriores não são retomadas, a cobrança do dia é enfileirada de novo. Leitura e
+        reserva são uma transação só, e a reserva confere o status de novo, então duas instâncias
+        (outro processo, outra sessão) nunca reservam a mesma mensagem.
+        """
+        if limit <= 0:
+            return []
+        now = time.time()
+        leased = []
+        with self._lock:
+            self._flush_locked()
+            with self._transaction():
+                rows = self._conn.execute(
+                    "SELECT key, payload, attempts FROM outbox WHERE user_key=? AND "
+                    "(status='pending' OR (status='leased' AND lease_until<?)) AND created_at>=? "
+                    "ORDER BY created_at, rowid",
+                    (str(user_key), now, local_day_start())).fetchall()
+                if keys is not None:
+                    wanted = set(keys)
+                    rows = [row for row in rows if row[0] in wanted]
+                for row in rows:
+                    if len(leased) >= limit:
+                        break
+                    cursor = self._conn.execute(
+                        "UPDATE outbox SET status='leased', lease_until=?, attempts=attempts+1, updated_at=? "
+                        "WHERE key=? AND (status='pending' OR (status='leased' AND lease_until<?))",
+                        (now + self.lease_seconds, now, row[0], now))
+                    if cursor.rowcount == 1:
+                        leased.append(row)
+        entries = []
+        for key, payload, attempts in leased:
+            data = json.loads(self.crypto.decrypt(payload))
+            entries.append(OutboxEntry(key, PendingClient(**data["client"]), data["body"], attempts + 1))
+        if entries:
+            logger.info(f"{len(entries)} mensagens reservadas na fila de saída")
+        return entries
+
+    def ack(self, entry: OutboxEntry, sid: str = None):
+        """Confirma o envio; a gravação entra no próximo commit em lote."""
+        self._record(SENT, entry, sid, None)
+
+    def fail(self, entry: OutboxEntry, error: str, retry: bool = False):
+        """Registra a falha; com retry a mensagem volta pra fila até max_attempts."""
+        status = PENDING if retry and entry.attempts < self.max_attempts else FAILED
+        self._record(status, entry, None, error)
+
+    def _record(self, status: str, entry: OutboxEntry, sid: Optional[str], error: Optional[str]):
+        with self._lock:
+            self._results.append((status, sid, error, time.time(), entry.key))
+            if len(self._results) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_seconds:
+                self._flush_locked()
+
+    def flush(self):
+        """Grava as confirmações pendentes; chame ao fim de cada envio."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._results:
+            return
+        results, self._results = self._results, []
+        with self._transaction():
+            # Mensagem já confirmada como enviada não volta pra fila nem vira falha
+            self._conn.executemany("UPDATE outbox SET status=?, sid=?, error=?, lease_until=0, updated_at=? "
+                                   "WHERE key=? AND status!='sent'", results)
+
+    def pending_count(self, user_key: str) -> int:
+        """Mensagens do usuário esperando reserva."""
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE user_key=? AND (status='pending' OR (status='leased' AND lease_until<?)) "
+                "AND created_at>=?", (str(user_key), time.time(), local_day_start())).fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+_outboxes = {}
+_outboxes_lock = threading.Lock()
+
+
+def get_message_outbox(path: str = None) -> MessageOutbox:
+    """Retorna a fila de saída compartilhada pelo processo pra esse arquivo (padrão: outbox.sqlite3).
+
+    Todas as sessões e visitas a /clients usam a mesma instância, com uma conexão só e um
+    buffer de confirmações só, no lugar de um MessageOutbox por MessageManager.
+    """
+    path = path or data_path("outbox.sqlite3")
+    with _outboxes_lock:
+        if path not in _outboxes:
+            _outboxes[path] = MessageOutbox(path)
+        return _outboxes[path]
@@ -2,13 +2,28 @@ import pymupdf as pp
 import anthropic
 import json
 import re
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from models.pending_client import PendingClient
+from services.chunker import (CHARS_PER_TOKEN, Chunk, build_chunks, estimate_tokens, is_header_line, page_layout_text,
+                              page_table_text, split_chunk)
+from services.client_validator import ClientValidator, validate_record
+from services.dedup import ClientDeduplicator, normalize_document
+from services.extraction_cache import ChunkCache, ExtractionCache
+from services.json_stream import JsonArrayStream
+from services.report_classifier import ReportClassifier
+from services.row_protocol import ROW_DELIMITER, ROW_FIELDS, ROWS_BLOCK_PATTERN, RowStream, parse_rows
+from services.table_parser import LocalTableParser
+from services.tool_schema import CLIENTS_TOOL, schema_errors
+from utils.secure_text import SecureText
 from dotenv import load_dotenv
 import os
-from flet.security import encrypt, decrypt
+from dataclasses import asdict
+import hashlib
 import logging
-from datetime import datetime
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import flet as ft
 
 load_dotenv()
@@ -16,14 +31,90 @@ load_dotenv()
 # Configurando o logger
 logger = logging.getLogger(__name__)
 
+# Incrementar sempre que o prompt mudar, pra invalidar o cache de chunks
+PROMPT_VERSION = "4"
+
+# Incrementar sempre que o parser local, o chunker ou a extração incremental mudarem os clientes
+# que saem de um PDF, pra invalidar os resultados e snapshots salvos
+EXTRACTION_VERSION = "2"
+
+EXTRACTION_INSTRUCTIONS = (
+    "You received a financial report in Portuguese. Identify tables or lists of pending clients. "
+    "Columns may include: Nome/Cliente (Name), CPF/CNPJ (ID), Valor/Dívida (Debt Amount), Vencimento/Data (Due Date), "
+    "Status/Situação (Status), Contato/Telefone (Contact). "
+)
+FIELD_INSTRUCTIONS = (
+    "id (CPF/CNPJ, remove spaces, dots, or dashes; if missing or empty, generate a temporary ID like 'TEMP_001', 'TEMP_002', etc.), "
+    "name (Nome/Cliente), debt_amount (Valor/Dívida, remove 'R$', convert to float), "
+    "due_date (Vencimento/Data, format DD/MM/YYYY; if invalid, set as 'PENDENTE'), "
+    "status (Status/Situação, e.g., 'Em atraso'), contact (Contato/Telefone, format (XX) XXXXX-XXXX). "
+    "Infer columns by context if labels are missing or different. "
+    "Keep lines with invalid dates by setting due_date to 'PENDENTE'. "
+)
+OUTPUT_INSTRUCTIONS = {
+    "json": (
+        "Extract the data and return it as a JSON array with the fields: " + FIELD_INSTRUCTIONS +
+        "Return the result as a JSON array in a Markdown block (```json ... ```). "
+        "If no valid data or table is found, return an empty array. "
+    ),
+    "rows": (
+        "Extract the data as delimiter-separated rows with the fields: " + FIELD_INSTRUCTIONS +
+        f"Return a Markdown block (```rows ... ```) whose first line is exactly '{ROW_DELIMITER.join(ROW_FIELDS)}', "
+        f"followed by one client per line with the values in that order separated by '{ROW_DELIMITER}'. "
+        "Write debt_amount with a dot as decimal separator and no thousands separator. "
+        "Do not quote values. If no valid data or table is found, return only the header line. "
+    ),
+    "tool": (
+        f"Extract the data and record it by calling the {CLIENTS_TOOL['name']} tool with the fields: " + FIELD_INSTRUCTIONS +
+        "If no valid data or table is found, call the tool with an empty clients list. "
+    ),
+}
+CHUNK_DONE = object()  # Marca o fim de um chunk na fila de streaming
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+# Saída estimada por cliente, usada pra limitar quantas linhas vão em cada chunk
+OUTPUT_TOKENS_PER_ROW = {"json": 60, "rows": 25, "tool": 60}
+
 
 class PDFExtractor:
-    def __init__(self, pdf_path: str, page):
+    def __init__(self, pdf_path: str, page, on_progress: Optional[Callable[[int, int, str], None]] = None,
+                 user_key: Optional[str] = None):
         self.pdf_path = pdf_path
         self.page = page
+        self.on_progress = on_progress  # Recebe (itens concluídos, total da etapa, nome da etapa)
+        self.user_key = user_key  # Identifica o usuário pra extração incremental contra o último relatório dele
+        self.cancel_event = threading.Event()
         self.client = anthropic.Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
-        self.MAX_TEXT_LENGTH = 10000  # Limite de caracteres pro Claude
+        self.MODEL = "claude-3-7-sonnet-20250219"
+        self.MAX_CHUNK_TOKENS = int(os.getenv("MAX_CHUNK_TOKENS", "2500"))  # Orçamento de entrada por chunk
+        self.MAX_OUTPUT_TOKENS = int(os.getenv("EXTRACTION_MAX_OUTPUT_TOKENS", "4096"))  # Limite de saída por chamada
+        self.OUTPUT_FORMAT = os.getenv("EXTRACTION_OUTPUT_FORMAT", "json")  # json ou rows (linhas compactas)
+        if self.OUTPUT_FORMAT not in OUTPUT_INSTRUCTIONS:
+            logger.warning(f"EXTRACTION_OUTPUT_FORMAT inválido: {self.OUTPUT_FORMAT}, usando json")
+            self.OUTPUT_FORMAT = "json"
+        self.OUTPUT_TOKENS_PER_ROW = OUTPUT_TOKENS_PER_ROW[self.OUTPUT_FORMAT]
+        self.MAX_SPLIT_DEPTH = 3  # Quantas vezes um chunk truncado pode ser dividido
+        self.MAX_REPAIR_ATTEMPTS = int(os.getenv("EXTRACTION_MAX_REPAIRS", "2"))  # Pedidos de correção por chunk
+        self.TABLE_REGIONS_ONLY = os.getenv("TABLE_REGIONS_ONLY", "1") == "1"  # Só manda ao Claude as regiões de tabela
+        self.STREAMING = os.getenv("EXTRACTION_STREAMING", "1") == "1"  # Entrega clientes antes da resposta terminar
+        self.MAX_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY", "4"))  # Chunks simultâneos no Claude
+        self.LOCAL_PARSER_ENABLED = os.getenv("LOCAL_PARSER_ENABLED", "1") == "1"  # Tenta tabelas sem o Claude antes
         self.SECRET_KEY = os.getenv("MY_APP_SECRET_KEY")
+        self.result_cache = ExtractionCache("pdf_results")
+        self.chunk_cache = ChunkCache()
+        self.from_cache = False  # Indica se o último resultado veio do cache
+        self.validator = ClientValidator()  # Relatório de validação da última extração
+        self.classifier = ReportClassifier()  # Decide se o texto é um relatório de inadimplência
+        self.deduplicator = ClientDeduplicator()  # Clientes já entregues na última extração
+        self.usage = Counter()  # Tokens da última extração, incluindo leitura/escrita do cache de prompt
+        self.repair_stats = Counter()  # Chunks, respostas fora do schema, reparos e perdas no modo tool
+        self._usage_lock = threading.Lock()
+        self.batch_responses = {}  # Chave do chunk -> Message já respondida por um Message Batch
+        self.skipped_chars = 0  # Texto fora das tabelas que deixou de ir pro Claude na última extração
+        self.INCREMENTAL_ENABLED = os.getenv("INCREMENTAL_EXTRACTION", "1") == "1"
+        self.snapshot_cache = ExtractionCache("report_snapshots")  # Último relatório processado por usuário
+        self._fingerprints = {}  # Número da página -> hash do texto, na extração incremental
+        self._page_groups = {}  # Hashes das páginas de origem -> clientes validados vindos delas
+        self.extraction_complete = True  # Falso se algum chunk falhou ou ficou incompleto
         logger.info(f"Iniciando PDFExtractor para {pdf_path}")
 
     def validate_pdf_path(self) -> bool:
@@ -71,73 +162,92 @@ class PDFExtractor:
             self.page.update()
             return False
 
-    def extract_text_from_pdf(self) -> str:
-        """Extrai texto do PDF com tratamento robusto."""
+    def iter_page_texts(self, pages: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, str]]:
+        """Gera (número da página, texto por linha visual) uma página por vez, sem montar o documento inteiro."""
+        selected_pages = set(pages) if pages is not None else None
+        with pp.open(self.pdf_path) as doc:
+            headers = self._carried_headers(doc, selected_pages) if selected_pages is not None else {}
+            for page in doc:
+                if selected_pages is not None and page.number not in selected_pages:
+                    continue
+                if self.TABLE_REGIONS_ONLY:
+                    text, skipped = page_table_text(page)
+                    self.skipped_chars += skipped
+                else:
+                    text = page_layout_text(page)
+                # Continuação de uma tabela que começou numa página fora da seleção leva o cabeçalho junto
+                if page.number in headers:
+                    text = f"{headers[page.number][1]}\n{text}"
+                yield page.number, text
+
+    @staticmethod
+    def _carried_headers(doc, pages: Iterable[int]) -> Dict[int, Tuple[int, str]]:
+        """Página selecionada -> (página, linha) do cabeçalho da tabela que ela continua.
+
+        Só entram páginas sem cabeçalho próprio cujo cabeçalho está numa página fora da seleção e
+        que são as primeiras selecionadas depois dele; as seguintes já o herdam da anterior.
+        """
+        selected = set(pages)
+        headers = {}
+        header, carried = None, False
+        for number in range(max(selected, default=-1) + 1):
+            lines = [line for line in page_layout_text(doc[number]).splitlines() if is_header_line(line)]
+            if lines:
+                header, carried = (number, lines[-1]), number in selected
+            elif number in selected:
+                if header and not carried:
+                    headers[number] = header
+                carried = True
+        return headers
+
+    def extract_text_from_pdf(self, pages: Optional[Iterable[int]] = None) -> Optional[SecureText]:
+        """Extrai texto do PDF com tratamento robusto (opcionalmente só das páginas indicadas)."""
         logger.info(f"Extraindo texto do PDF: {self.pdf_path}")
         if not self.validate_pdf_path():
             logger.warning("Validação do caminho falhou, retornando vazio")
-            return ""
+            return None
 
         try:
-            doc = pp.open(self.pdf_path)
-            if doc.page_count == 0:
+            with pp.open(self.pdf_path) as doc:
+                page_count = doc.page_count
+            if page_count == 0:
                 logger.warning(f"PDF sem páginas: {self.pdf_path}")
                 self.page.open(ft.SnackBar(ft.Text("Erro: Esse PDF tá vazio ou sem páginas!", color=ft.Colors.ERROR)))
                 self.page.update()
-                doc.close()
-                return ""
+                return None
 
-            text = ""
-            for page in doc:
-                page_text = page.get_text("text") or ""
-                if not isinstance(page_text, str):
-                    logger.warning(f"Texto da página {page.number} não é string: {type(page_text)}")
-                    page_text = str(page_text)
-                text += page_text + "\n"
-            doc.close()
-
-            if not text.strip():
+            text = SecureText(self.iter_page_texts(pages))
+
+            if not text:
                 logger.warning(f"PDF sem texto útil: {self.pdf_path}")
-                self.page.open(ft.SnackBar(ft.Text("Erro: Esse PDF não tem texto útil!", color=ft.Colors.ERROR)))
-                self.page.update()
-                return ""
+                if pages is None:
+                    self.page.open(ft.SnackBar(ft.Text("Erro: Esse PDF não tem texto útil!", color=ft.Colors.ERROR)))
+                    self.page.update()
+                return None
 
-            logger.info(f"Texto extraído com sucesso: {len(text)} caracteres")
-            encrypted_text = encrypt(text, self.SECRET_KEY)
-            logger.debug(f"Texto criptografado: {len(encrypted_text)} bytes")
-            return encrypted_text
+            logger.info(f"Texto extraído com sucesso: {text!r}")
+            return text
         except pp.PyMuPDFError as e:
             logger.error(f"Erro do PyMuPDF ao ler PDF: {e}")
             self.page.open(ft.SnackBar(ft.Text(f"Erro: Problema ao ler o PDF. Suporte: {e}", color=ft.Colors.ERROR)))
             self.page.update()
-            return ""
+            return None
         except Exception as e:
             logger.error(f"Erro inesperado ao extrair texto: {e}")
             self.page.open(ft.SnackBar(
                 ft.Text(f"Erro: Algo deu errado ao extrair o texto. Suporte: {e}", color=ft.Colors.ERROR)))
             self.page.update()
-            return ""
+            return None
 
-    def validate_extracted_text(self, text: str) -> bool:
+    def validate_extracted_text(self, text: SecureText) -> bool:
         """Valida se o texto extraído é relevante pra inadimplência."""
         logger.info("Validando texto extraído")
-        if not isinstance(text, str) or not text.strip():
+        if not isinstance(text, SecureText) or not text:
             logger.warning("Texto extraído inválido ou vazio")
             return False
 
         try:
-            decrypted_text = decrypt(text, self.SECRET_KEY)
-            if not decrypted_text.strip():
-                logger.warning("Texto descriptografado vazio")
-                return False
-
-            keywords = ["inadimplente", "inadimplência", "atraso", "renegociado", "vencimento", "dívida", "pendente"]
-            financial_keywords = ["valor", "pagamento", "cliente", "cpf", "cnpj", "telefone"]
-
-            has_main_keywords = any(keyword.lower() in decrypted_text.lower() for keyword in keywords)
-            has_financial_context = any(keyword.lower() in decrypted_text.lower() for keyword in financial_keywords)
-
-            if has_main_keywords and has_financial_context:
+            if self.classifier.is_report(page_text for _, page_text in text.pages()):
                 logger.info("Texto validado como relatório de inadimplência")
                 return True
             else:
@@ -153,191 +263,526 @@ class PDFExtractor:
             self.page.update()
             return False
 
-    def extract_clients_with_claude(self, text: str) -> List[dict]:
+    def _extract_chunk(self, i: int, chunk: str, emit: Optional[Callable[[dict], None]] = None) -> List[dict]:
+        """Envia um chunk pro Claude (ou pega do cache) e devolve a lista de clientes encontrada."""
+        logger.debug(f"Tabela possivelmente encontrada no chunk {i}: {len(chunk)} caracteres")
+        cache_key = self._chunk_key(chunk)
+        cached_clients = self.chunk_cache.get(cache_key)
+        if cached_clients is not None:
+            logger.info(f"Chunk {i} servido pelo cache: {len(cached_clients)} clientes")
+            return cached_clients
+
+        # No modo Message Batch a resposta já veio no lote; truncamentos ainda são refeitos online
+        chunk_clients, complete = self._request_chunk(i, chunk, message=self.batch_responses.get(cache_key), emit=emit)
+        if complete:
+            logger.info(f"Extraídos {len(chunk_clients)} clientes do chunk {i}")
+            self.chunk_cache.set(cache_key, chunk_clients)
+        else:
+            self.extraction_complete = False
+        return chunk_clients
+
+    def _chunk_key(self, chunk: str) -> str:
+        return ChunkCache.make_key(f"{PROMPT_VERSION}-{self.OUTPUT_FORMAT}", self.MODEL, chunk)
+
+    def _message_params(self, chunk: str) -> dict:
+        """Parâmetros do messages.create pra um chunk (os mesmos no modo online e no Message Batch)."""
+        # Instruções fixas no system com cache_control: chunks e relatórios seguintes só pagam o texto do chunk
+        params = {
+            "model": self.MODEL,
+            "max_tokens": self.MAX_OUTPUT_TOKENS,
+            "system": [{
+                "type": "text",
+                "text": f"{EXTRACTION_INSTRUCTIONS}{OUTPUT_INSTRUCTIONS[self.OUTPUT_FORMAT]}",
+                "cache_control": {"type": "ephemeral"},
+            }],
+            "messages": [{"role": "user", "content": chunk}],
+        }
+        if self.OUTPUT_FORMAT == "tool":
+            params["tools"] = [CLIENTS_TOOL]
+            params["tool_choice"] = {"type": "tool", "name": CLIENTS_TOOL["name"]}
+        return params
+
+    def _create_message(self, chunk: str, emit: Optional[Callable[[dict], None]] = None):
+        """Chama o Claude; com streaming, repassa pra emit cada cliente assim que ele fecha na resposta."""
+        params = self._message_params(chunk)
+        # Na saída por ferramenta não há texto pra ir parseando; o resultado chega inteiro
+        if not (self.STREAMING and emit) or self.OUTPUT_FORMAT == "tool":
+            return self.client.messages.create(**params)
+        parser = RowStream() if self.OUTPUT_FORMAT == "rows" else JsonArrayStream()
+        with self.client.messages.stream(**params) as stream:
+            for delta in stream.text_stream:
+                for client in parser.feed(delta):
+                    emit(client)
+            return stream.get_final_message()
+
+    def _request_chunk(self, i: int, chunk: str, depth: int = 0, message=None,
+                       emit: Optional[Callable[[dict], None]] = None) -> Tuple[List[dict], bool]:
+        """Chama o Claude pra um chunk; retorna (clientes, resposta completa).
+
+        Se a resposta vier truncada (stop_reason max_tokens ou bloco sem fechar), divide só esse
+        chunk ao meio e tenta de novo, até MAX_SPLIT_DEPTH vezes. Clientes já repassados pra emit
+        antes do truncamento voltam a aparecer nas partes; quem consome deduplica.
+        """
+        if message is None:
+            message = self._create_message(chunk, emit)
+        self._record_usage(message)
+        if self.OUTPUT_FORMAT == "tool":
+            return self._parse_tool_response(i, chunk, depth, message, emit)
+        response_text = message.content[0].text
+        logger.debug(f"Resposta do Claude recebida no chunk {i}: {len(response_text)} caracteres")
+        if self.OUTPUT_FORMAT == "rows":
+            return self._parse_rows_response(i, chunk, depth, message.stop_reason, response_text, emit)
+        json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+        if message.stop_reason == "max_tokens" or (not json_match and "```json" in response_text):
+            return self._retry_truncated_chunk(i, chunk, depth, emit)
+        if not json_match:
+            return [], False
+
+        try:
+            chunk_clients = json.loads(json_match.group(1))
+        except json.JSONDecodeError as e:
+            logger.error(f"Erro ao parsear JSON do Claude no chunk {i}: {e}")
+            self.page.open(ft.SnackBar(
+                ft.Text(f"Erro: Problema ao interpretar o JSON do Claude no chunk {i}. Suporte: {e}", color=ft.Colors.RED)))
+            return [], False
+
+        if not isinstance(chunk_clients, list):
+            return [], False
+        return chunk_clients, True
+
+    def _record_usage(self, message):
+        usage = getattr(message, "usage", None)
+        if usage is None:
+            return
+        with self._usage_lock:
+            for name in USAGE_FIELDS:
+                self.usage[name] += getattr(usage, name, None) or 0
+
+    def _parse_tool_response(self, i: int, chunk: str, depth: int, message,
+                             emit: Optional[Callable[[dict], None]]) -> Tuple[List[dict], bool]:
+        """Valida a chamada de record_clients; se vier fora do schema, pede a correção só deste chunk."""
+        for attempt in range(self.MAX_REPAIR_ATTEMPTS + 1):
+            if message.stop_reason == "max_tokens":
+                return self._retry_truncated_chunk(i, chunk, depth, emit)
+            tool_use = next((block for block in message.content if block.type == "tool_use"), None)
+            errors = schema_errors(tool_use.input) if tool_use else [f"no {CLIENTS_TOOL['name']} tool call"]
+            self._count_repair("chunks" if attempt == 0 else "repair_calls")
+            if not errors:
+                if attempt:
+                    self._count_repair("repaired")
+                return tool_use.input["clients"], True
+            if attempt == 0:
+                self._count_repair("malformed")
+            logger.warning(f"Saída fora do schema no chunk {i} (tentativa {attempt + 1}): {errors[:3]}")
+            if attempt < self.MAX_REPAIR_ATTEMPTS:
+                message = self._repair_message(chunk, message, tool_use, errors)
+                self._record_usage(message)
+
+        self._count_repair("failed")
+        logger.error(f"Chunk {i} continuou fora do schema após {self.MAX_REPAIR_ATTEMPTS} reparos")
+        self.page.open(ft.SnackBar(
+            ft.Text(f"Erro: O Claude devolveu dados inválidos no chunk {i}.", color=ft.Colors.RED)))
+        return [], False
+
+    def _repair_message(self, chunk: str, message, tool_use, errors: List[str]):
+        """Reenvia a conversa do chunk com os erros de schema pra o Claude corrigir só essa resposta."""
+        params = self._message_params(chunk)
+        instruction = (f"The {CLIENTS_TOOL['name']} input does not match the schema: {'; '.join(errors)}. "
+                       f"Call {CLIENTS_TOOL['name']} again with the corrected data for this same excerpt.")
+        if tool_use:
+            feedback = [{"type": "tool_result", "tool_use_id": tool_use.id, "is_error": True, "content": instruction}]
+        else:
+            feedback = instruction
+        params["messages"] += [{"role": "assistant", "content": message.content}, {"role": "user", "content": feedback}]
+        return self.client.messages.create(**params)
+
+    def _count_repair(self, name: str):
+        with self._usage_lock:
+            self.repair_stats[name] += 1
+
+    def _parse_rows_response(self, i: int, chunk: str, depth: int, stop_reason: str,
+                             response_text: str, emit: Optional[Callable[[dict], None]]) -> Tuple[List[dict], bool]:
+        rows_match = ROWS_BLOCK_PATTERN.search(response_text)
+        if stop_reason == "max_tokens" or (not rows_match and "```rows" in response_text):
+            return self._retry_truncated_chunk(i, chunk, depth, emit)
+        if not rows_match:
+            return [], False
+        return parse_rows(rows_match.group(1)), True
+
+    def _retry_truncated_chunk(self, i: int, chunk: str, depth: int,
+                               emit: Optional[Callable[[dict], None]]) -> Tuple[List[dict], bool]:
+        parts = split_chunk(chunk) if depth < self.MAX_SPLIT_DEPTH else None
+        if not parts:
+            logger.error(f"Resposta truncada no chunk {i} e não dá pra dividir mais; linhas perdidas")
+            self.page.open(ft.SnackBar(
+                ft.Text(f"Erro: A resposta do Claude veio incompleta no chunk {i}.", color=ft.Colors.RED)))
+            return [], False
+
+        logger.warning(f"Resposta truncada no chunk {i} (nível {depth}), dividindo em {len(parts)} partes")
+        chunk_clients, complete = [], True
+        for part in parts:
+            part_clients, part_complete = self._request_chunk(i, part, depth + 1, emit=emit)
+            chunk_clients.extend(part_clients)
+            complete = complete and part_complete
+        return chunk_clients, complete
+
+    def _report_progress(self, done: int, total: int, stage: str):
+        """Avisa o callback de progresso, se houver, sem derrubar a extração."""
+        if not self.on_progress:
+            return
+        try:
+            self.on_progress(done, total, stage)
+        except Exception as e:
+            logger.warning(f"Erro no callback de progresso: {e}")
+
+    def cancel(self):
+        """Pede pra extração em andamento parar no próximo ponto seguro."""
+        logger.info("Cancelamento da extração solicitado")
+        self.cancel_event.set()
+
+    def iter_chunks(self, text: SecureText) -> Iterator[Chunk]:
+        """Gera os chunks com tabela, alinhados a páginas e linhas."""
+        skipped = 0
+        # Linhas por chunk limitadas pra resposta esperada caber no limite de saída, com folga de 20%
+        max_rows = max(1, int(self.MAX_OUTPUT_TOKENS * 0.8) // self.OUTPUT_TOKENS_PER_ROW)
+        for chunk in build_chunks(text.pages(), self.MAX_CHUNK_TOKENS, max_rows):
+            if not chunk.has_table:
+                skipped += 1
+                self.skipped_chars += len(chunk.text)
+                continue
+            logger.debug(f"Chunk {chunk.index}: páginas {chunk.pages}, ~{estimate_tokens(chunk.text)} tokens")
+            yield chunk
+        if skipped:
+            logger.info(f"{skipped} chunks sem tabela ignorados")
+
+    def iter_claude_clients(self, text: SecureText, check_relevance: bool = True) -> Iterator[dict]:
+        """Gera os clientes do Claude na ordem dos chunks, assim que cada chunk fica pronto."""
+        for _, client in self._iter_chunk_clients(text, check_relevance):
+            yield client
+
+    def _iter_chunk_clients(self, text: SecureText, check_relevance: bool) -> Iterator[Tuple[List[int], dict]]:
+        """Como iter_claude_clients, mas junto com as páginas do chunk de onde cada cliente veio."""
         logger.info("Iniciando extração com Claude")
-        if not self.validate_extracted_text(text):
+        if check_relevance and not self.validate_extracted_text(text):
             logger.warning("Texto inválido pra extração, retornando vazio")
-            return []
+            return
 
+        executor = ThreadPoolExecutor(max_workers=max(1, self.MAX_CONCURRENCY))
         try:
-            decrypted_text = decrypt(text, self.SECRET_KEY)
-            logger.debug(f"Texto descriptografado: {len(decrypted_text)} caracteres")
-
-            # Divide o texto em pedaços com sobreposição pra não cortar tabelas
-            chunk_size = self.MAX_TEXT_LENGTH
-            overlap = 500  # Sobreposição pra garantir que linhas não sejam cortadas
-            chunks = [decrypted_text[i:i + chunk_size] for i in range(0, len(decrypted_text), chunk_size - overlap)]
-            clients_data = {}
-
-            for i, chunk in enumerate(chunks):
-                if "Nome" in chunk:  # Heurística pra achar tabela
-                    logger.debug(f"Tabela possivelmente encontrada no chunk {i}: {len(chunk)} caracteres")
-                    prompt = (
-                        "You received a financial report in Portuguese. Identify tables or lists of pending clients. "
-                        "Columns may include: Nome/Cliente (Name), CPF/CNPJ (ID), Valor/Dívida (Debt Amount), Vencimento/Data (Due Date), "
-                        "Status/Situação (Status), Contato/Telefone (Contact). "
-                        "Extract the data and return it as a JSON array with the fields: "
-                        "id (CPF/CNPJ, remove spaces, dots, or dashes; if missing or empty, generate a temporary ID like 'TEMP_001', 'TEMP_002', etc.), "
-                        "name (Nome/Cliente), debt_amount (Valor/Dívida, remove 'R$', convert to float), "
-                        "due_date (Vencimento/Data, format DD/MM/YYYY; if invalid, set as 'PENDENTE'), "
-                        "status (Status/Situação, e.g., 'Em atraso'), contact (Contato/Telefone, format (XX) XXXXX-XXXX). "
-                        "Infer columns by context if labels are missing or different. "
-                        "Keep lines with invalid dates by setting due_date to 'PENDENTE'. "
-                        "Return the result as a JSON array in a Markdown block (```json ... ```). "
-                        "If no valid data or table is found, return an empty array. "
-                        f"{chunk}"
-                    )
-                    message = self.client.messages.create(
-                        model="claude-3-7-sonnet-20250219",
-                        max_tokens=2000,
-                        messages=[{"role": "user", "content": prompt}]
-                    )
-                    response_text = message.content[0].text
-                    logger.debug(f"Resposta do Claude recebida no chunk {i}: {len(response_text)} caracteres")
-                    json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-
-                    if json_match:
-                        try:
-                            chunk_clients = json.loads(json_match.group(1))
-                            if isinstance(chunk_clients, list):
-                                for client in chunk_clients:
-                                    # Usa ID + nome como chave pra evitar duplicatas
-                                    client_key = f"{client['id']}_{client['name']}_{client['due_date']}"
-                                    clients_data[client_key] = client
-                                logger.info(f"Extraídos {len(chunk_clients)} clientes do chunk {i}")
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Erro ao parsear JSON do Claude no chunk {i}: {e}")
-                            self.page.open(ft.SnackBar(
-                                ft.Text(f"Erro: Problema ao interpretar o JSON do Claude no chunk {i}. Suporte: {e}", color=ft.Colors.RED)))
-
-            clients_list = list(clients_data.values())
-            if not clients_list:
+            # Dispara os chunks em paralelo, mas entrega na ordem original pra manter a deduplicação estável.
+            # Cada chunk tem uma fila onde o streaming coloca os clientes conforme chegam; o fim do chunk é um marcador.
+            streams = []
+            for chunk in self.iter_chunks(text):
+                arrivals = queue.Queue()
+                future = executor.submit(self._extract_chunk, chunk.index, chunk.text, arrivals.put)
+                future.add_done_callback(lambda _, arrivals=arrivals: arrivals.put(CHUNK_DONE))
+                streams.append((chunk, future, arrivals))
+            total = len(streams)
+            logger.info(f"Enviando {total} chunks pro Claude com concorrência {self.MAX_CONCURRENCY}")
+
+            # Só descarta o registro idêntico que veio no streaming e de novo no resultado final; a
+            # deduplicação por CPF/nome fica pra _to_pending_clients, depois da validação
+            delivered = set()
+            extracted = 0
+            for done, (chunk, future, arrivals) in enumerate(streams, start=1):
+                while True:
+                    if self.cancel_event.is_set():
+                        logger.info(f"Extração cancelada no chunk {chunk.index}")
+                        return
+                    try:
+                        client = arrivals.get(timeout=0.2)
+                    except queue.Empty:
+                        continue
+                    if client is CHUNK_DONE:
+                        break
+                    if self._first_delivery(client, delivered):
+                        extracted += 1
+                        yield chunk.pages, client
+                # O resultado final cobre o que não veio por streaming (cache, Message Batch, retentativas)
+                for client in future.result():
+                    if self._first_delivery(client, delivered):
+                        extracted += 1
+                        yield chunk.pages, client
+                self._report_progress(done, total, "Analisando tabelas")
+
+            logger.info(f"Cache de chunks: {self.chunk_cache.stats()}")
+            if not extracted:
                 logger.info("Nenhum cliente extraído pelos chunks")
             else:
-                logger.info(f"Total de {len(clients_list)} clientes extraídos dos chunks")
-            return clients_list
+                logger.info(f"Total de {extracted} clientes extraídos dos chunks")
 
         except anthropic.APIError as e:
+            self.extraction_complete = False
             logger.error(f"Erro na API do Anthropic: {e}")
             self.page.open(ft.SnackBar(ft.Text(f"Erro: Problema na API do Claude. Suporte: {e}", color=ft.Colors.RED)))
             self.page.update()
-            return []
         except Exception as e:
+            self.extraction_complete = False
             logger.error(f"Erro inesperado ao extrair com Claude: {e}")
             self.page.open(ft.SnackBar(
                 ft.Text(f"Erro: Algo deu errado ao extrair com Claude. Suporte: {e}", color=ft.Colors.RED)))
             self.page.update()
-            return []
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-    def validate_client_data(self, client_data: dict) -> Optional[dict]:
-        """Valida e sanitiza os dados de um cliente com suporte a IDs temporários e telefones fixos."""
-        logger.info(f"Validando dados do cliente: {client_data}")
-        required_fields = {"id", "name", "debt_amount", "due_date", "status", "contact"}
-        if not isinstance(client_data, dict) or not all(field in client_data for field in required_fields):
-            logger.warning(f"Dados de cliente inválidos ou incompletos: {client_data}")
-            return None
-
-        sanitized_data = {}
-
-        # Validação do ID (CPF/CNPJ ou TEMP_XXX)
-        id_str = str(client_data["id"]).replace(" ", "").replace(".", "").replace("-", "").replace("/", "")
-        if id_str.startswith('TEMP_'):
-            sanitized_data["id"] = id_str
-            logger.info(f"ID temporário aceito: {id_str}")
-        elif 11 <= len(id_str) <= 14 and id_str.isdigit():
-            sanitized_data["id"] = id_str
-        else:
-            logger.warning(f"ID inválido: {id_str}")
-            return None
-
-        # Nome
-        name = str(client_data["name"]).strip()
-        if not name or len(name) < 2:
-            logger.warning(f"Nome inválido: {name}")
-            return None
-        sanitized_data["name"] = name
-
-        # Valor da dívida
-        try:
-            debt_amount = float(str(client_data["debt_amount"]).replace(",", ".").replace("R$", "").strip())
-            if debt_amount <= 0:
-                logger.warning(f"Valor da dívida inválido: {debt_amount}")
-                return None
-            sanitized_data["debt_amount"] = debt_amount
-        except (ValueError, TypeError):
-            logger.warning(f"Erro ao converter valor da dívida: {client_data['debt_amount']}")
-            return None
-
-        # Data de vencimento
-        due_date = str(client_data["due_date"]).strip()
-        if due_date == "PENDENTE":
-            sanitized_data["due_date"] = "PENDENTE"
-            logger.warning(f"Data pendente para {name}: corrigir manualmente")
-        else:
-            try:
-                datetime.strptime(due_date, "%d/%m/%Y")
-                sanitized_data["due_date"] = due_date
-            except ValueError:
-                logger.warning(f"Data de vencimento inválida: {due_date}")
-                return None
+    @staticmethod
+    def _first_delivery(client, delivered: set) -> bool:
+        """Registra o registro bruto e diz se é a primeira vez que ele aparece, com o mesmo conteúdo."""
+        if not isinstance(client, dict):
+            return False
+        key = json.dumps(client, sort_keys=True, ensure_ascii=False, default=str)
+        if key in delivered:
+            return False
+        delivered.add(key)
+        return True
 
-        # Status
-        status = str(client_data["status"]).strip().lower()
-        valid_statuses = {"em atraso", "renegociado", "pendente", "vencido", "aberto"}
-        if not status or status not in valid_statuses:
-            logger.warning(f"Status inválido: {status}")
-            return None
-        sanitized_data["status"] = status.capitalize()
+    def extract_clients_with_claude(self, text: SecureText, check_relevance: bool = True) -> List[dict]:
+        return list(self.iter_claude_clients(text, check_relevance))
 
-        # Contato (telefone)
-        contact = str(client_data["contact"]).strip()
-        contact_clean = re.sub(r"[^\d]", "", contact)
-        if not (10 <= len(contact_clean) <= 11) or not contact_clean.isdigit():
-            logger.warning(f"Contato inválido: {contact}")
-            return None
-        formatted_contact = f"({contact_clean[:2]}) {contact_clean[2:6 if len(contact_clean) == 10 else 7]}-{contact_clean[6 if len(contact_clean) == 10 else 7:]}"
-        sanitized_data["contact"] = formatted_contact
-        # Checa se é celular (Twilio-compatible)
-        if re.match(r'^\(\d{2}\) 9\d{4}-\d{4}$', formatted_contact):
-            sanitized_data["twilio_compatible"] = True
-            logger.info(f"Telefone celular detectado: {formatted_contact}")
-        else:
-            sanitized_data["twilio_compatible"] = False
-            logger.warning(f"Telefone fixo detectado: {formatted_contact}")
-
-        logger.info(f"Dados do cliente validados com sucesso: {sanitized_data}")
+    def validate_client_data(self, client_data: dict) -> Optional[dict]:
+        """Valida e sanitiza os dados de um cliente com suporte a IDs temporários e telefones fixos."""
+        sanitized_data, error = validate_record(client_data)
+        if error:
+            logger.debug(f"Cliente rejeitado: {error[0]} ({error[1]})")
         return sanitized_data
 
-    def extract_pending_data(self) -> List[PendingClient]:
-        """Extrai dados de clientes pendentes com validação robusta."""
+    def _to_pending_clients(self, clients_data: Iterable[dict]) -> List[PendingClient]:
+        # Depois da validação, pra que uma cópia inválida não bloqueie a versão válida do mesmo cliente
+        return [self._build_pending_client(data) for data in self.validator.validate_many(clients_data)
+                if self.deduplicator.is_new(data)]
+
+    @staticmethod
+    def _build_pending_client(validated_data: dict) -> PendingClient:
+        return PendingClient(
+            name=validated_data["name"],
+            debt_amount=f"R$ {validated_data['debt_amount']:.2f}".replace(".", ","),
+            due_date=validated_data["due_date"],
+            status=validated_data["status"],
+            contact=validated_data["contact"],
+            document=normalize_document(validated_data["id"])
+        )
+
+    def iter_pending_clients(self) -> Iterator[PendingClient]:
+        """Gera os clientes validados à medida que cada página ou chunk é concluído."""
         logger.info(f"Iniciando extração de dados pendentes do PDF: {self.pdf_path}")
-        extracted_text = self.extract_text_from_pdf()
-        if not extracted_text:
-            logger.info("Nenhum texto extraído, retornando lista vazia")
-            return []
+        self.from_cache = False
+        self.cancel_event.clear()
+        if not self.validate_pdf_path():
+            return
 
-        clients_data = self.extract_clients_with_claude(extracted_text)
-        if not clients_data:
-            logger.info("Nenhum cliente extraído pelo Claude")
-            return []
+        # Mesmo PDF (mesmo com outro nome) reaproveita o resultado já validado
+        pdf_hash = ExtractionCache.hash_file(self.pdf_path)
+        cached_clients = self.result_cache.get(self.result_key(pdf_hash))
+        if cached_clients is not None:
+            self.from_cache = True
+            logger.info(f"Resultado recuperado do cache: {len(cached_clients)} clientes")
+            yield from (PendingClient(**client) for client in cached_clients)
+            return
 
         clients = []
-        for client_data in clients_data:
-            validated_data = self.validate_client_data(client_data)
-            if validated_data:
-                clients.append(PendingClient(
-                    name=validated_data["name"],
-                    debt_amount=f"R$ {validated_data['debt_amount']:.2f}".replace(".", ","),
-                    due_date=validated_data["due_date"],
-                    status=validated_data["status"],
-                    contact=validated_data["contact"]
-                ))
-            else:
-                logger.warning(f"Cliente descartado por validação: {client_data}")
+        self.validator = ClientValidator()
+        self.deduplicator = ClientDeduplicator()
+        self.usage = Counter()
+        self.repair_stats = Counter()
+        self.skipped_chars = 0
+        self.extraction_complete = True
+
+        # Relatório reemitido: páginas iguais às do último relatório do usuário reaproveitam os clientes já validados
+        pending_pages = None
+        for client in self._iter_unchanged_clients():
+            clients.append(client)
+            yield client
+        if self._fingerprints:
+            reused = set(fingerprint for group in self._page_groups for fingerprint in group)
+            pending_pages = [number for number, fingerprint in self._fingerprints.items() if fingerprint not in reused]
+            if not pending_pages:
+                self.from_cache = True
+                self._finish_extraction(pdf_hash, clients)
+                return
+
+        # Tabelas limpas saem direto da geometria do PDF; o Claude só vê as páginas que o parser não entendeu
+        fallback_pages = pending_pages
+        if self.LOCAL_PARSER_ENABLED:
+            try:
+                doc = pp.open(self.pdf_path)
+            except Exception as e:
+                logger.warning(f"Parser local indisponível, usando só o Claude: {e}")
+                doc = None
+            if doc is not None:
+                with doc:
+                    parser = LocalTableParser()
+                    fallback_pages = []
+                    # Páginas reaproveitadas com o cabeçalho de uma página pendente só passam pelo parser pra
+                    # ele carregar o cabeçalho; as linhas delas já vieram do snapshot
+                    header_pages = set() if pending_pages is None else set(
+                        number for number, _ in self._carried_headers(doc, pending_pages).values())
+                    for page in doc:
+                        if self.cancel_event.is_set():
+                            logger.info(f"Extração cancelada na página {page.number}")
+                            return
+                        if pending_pages is not None and page.number not in pending_pages:
+                            if page.number in header_pages:
+                                parser.parse_page(page)
+                            continue
+                        rows = parser.parse_page(page)
+                        if rows is None:
+                            fallback_pages.append(page.number)
+                        else:
+                            self._remember_pages([page.number], [])
+                            for client in self._to_pending_clients(rows):
+                                self._remember_pages([page.number], [client])
+                                clients.append(client)
+                                yield client
+                        self._report_progress(page.number + 1, doc.page_count, "Lendo páginas")
+                logger.info(f"Parser local: {len(clients)} clientes, {len(fallback_pages)} páginas pro Claude")
+
+        if fallback_pages is None or fallback_pages:
+            extracted_text = self.extract_text_from_pdf(pages=fallback_pages)
+            if extracted_text:
+                for client in self._iter_claude_stage(extracted_text, check_relevance=not clients):
+                    clients.append(client)
+                    yield client
+            # Páginas sem nenhum cliente também entram no snapshot, pra não voltarem pro Claude
+            covered = set(fingerprint for group in self._page_groups for fingerprint in group)
+            for number in fallback_pages if fallback_pages is not None else self._fingerprints:
+                if self._fingerprints and self._fingerprints[number] not in covered:
+                    self._remember_pages([number], [])
+
+        self._finish_extraction(pdf_hash, clients)
+
+    def _iter_claude_stage(self, extracted_text: SecureText, check_relevance: bool) -> Iterator[PendingClient]:
+        # O texto só vive em memória durante esta etapa e é zerado ao sair do bloco
+        with extracted_text:
+            for pages, client_data in self._iter_chunk_clients(extracted_text, check_relevance):
+                for client in self._to_pending_clients([client_data]):
+                    self._remember_pages(pages, [client])
+                    yield client
+
+    def _extraction_settings(self) -> str:
+        """Versões e configurações que mudam os clientes extraídos de um mesmo PDF."""
+        settings = (EXTRACTION_VERSION, PROMPT_VERSION, self.OUTPUT_FORMAT, self.MODEL, self.LOCAL_PARSER_ENABLED,
+                    self.TABLE_REGIONS_ONLY)
+        return "\x00".join(str(setting) for setting in settings)
+
+    def result_key(self, pdf_hash: str) -> str:
+        """Chave do resultado validado: o conteúdo do PDF junto com a configuração que o produziu."""
+        return ExtractionCache.hash_text(f"{pdf_hash}\x00{self._extraction_settings()}")
+
+    def _snapshot_key(self) -> str:
+        key = f"snapshot\x00{self.user_key}\x00{self._extraction_settings()}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _iter_unchanged_clients(self) -> Iterator[PendingClient]:
+        """Calcula o hash de cada página e devolve os clientes dos grupos de páginas que não mudaram.
+
+        Cada grupo do snapshot é uma página do parser local ou o conjunto de páginas de um chunk do
+        Claude; ele só é reaproveitado se todas as suas páginas continuam no relatório. Grupos com
+        páginas que sumiram ou mudaram são descartados, junto com os clientes deles.
+        """
+        self._fingerprints, self._page_groups = {}, {}
+        if not (self.user_key and self.INCREMENTAL_ENABLED):
+            return
+        try:
+            with pp.open(self.pdf_path) as doc:
+                self._fingerprints = {page.number: ExtractionCache.hash_text(page.get_text()) for page in doc}
+        except Exception as e:
+            logger.warning(f"Não foi possível calcular os hashes das páginas, extraindo tudo: {e}")
+            return
+
+        snapshot = self.snapshot_cache.get(self._snapshot_key()) or {"groups": []}
+        current = set(self._fingerprints.values())
+        # Página que divide um chunk com outra que mudou também precisa ser reextraída, e assim por diante
+        stale = set(fp for group in snapshot["groups"] for fp in group["pages"] if fp not in current)
+        changed = True
+        while changed:
+            changed = False
+            for group in snapshot["groups"]:
+                if stale.intersection(group["pages"]) and not stale.issuperset(group["pages"]):
+                    stale.update(group["pages"])
+                    changed = True
+        for group in snapshot["groups"]:
+            if not stale.intersection(group["pages"]):
+                self._page_groups[tuple(group["pages"])] = group["clients"]
+        reused_clients = [client for group in self._page_groups.values() for client in group]
+        reused_pages = len(set(fp for group in self._page_groups for fp in group))
+        logger.info(f"Extração incremental: {reused_pages} de {len(current)} páginas sem mudança, "
+                    f"{len(reused_clients)} clientes reaproveitados")
+        for client in reused_clients:
+            client = PendingClient(**client)
+            if self.deduplicator.is_new(client):
+                yield client
+
+    def _remember_pages(self, page_numbers: List[int], clients: List[PendingClient]):
+        """Associa os clientes às páginas de origem pro snapshot da extração incremental."""
+        if not self._fingerprints:
+            return
+        key = tuple(self._fingerprints[number] for number in page_numbers)
+        self._page_groups.setdefault(key, []).extend(asdict(client) for client in clients)
+
+    def _finish_extraction(self, pdf_hash: str, clients: List[PendingClient]):
+        self.validator.report.log_summary()
+        if self.deduplicator.duplicates:
+            logger.info(f"{self.deduplicator.duplicates} clientes duplicados descartados")
+        if self.usage:
+            logger.info(f"Tokens do Claude: {dict(self.usage)}")
+        if self.repair_stats["chunks"]:
+            stats = self.repair_stats
+            logger.info(f"Saída estruturada: {stats['malformed']} de {stats['chunks']} chunks fora do schema "
+                        f"({stats['malformed'] / stats['chunks']:.0%}), {stats['repaired']} reparados com "
+                        f"{stats['repair_calls']} chamadas extras, {stats['failed']} perdidos")
+        if self.skipped_chars:
+            logger.info(f"Texto fora das tabelas não enviado ao Claude: {self.skipped_chars} caracteres "
+                        f"(~{self.skipped_chars // CHARS_PER_TOKEN} tokens)")
+        if self.cancel_event.is_set():
+            logger.info(f"Extração cancelada com {len(clients)} clientes parciais")
+            return
+
+        if self._fingerprints and self.extraction_complete:
+            groups = [{"pages": list(pages), "clients": group} for pages, group in self._page_groups.items()]
+            self.snapshot_cache.set(self._snapshot_key(), {"groups": groups})
 
         logger.info(f"Extração concluída: {len(clients)} clientes válidos")
         if clients:
             pendentes = sum(1 for c in clients if c.due_date == "PENDENTE")
             if pendentes > 0:
                 logger.info(f"{pendentes} clientes com data pendente")
+            if self.extraction_complete:
+                self.result_cache.set(self.result_key(pdf_hash), [asdict(client) for client in clients])
+            else:
+                # Resultado parcial não vai pro cache, senão o próximo envio nunca recupera o que faltou
+                logger.warning("Extração incompleta, resultado não salvo no cache")
+
+    def extract_pending_data(self) -> List[PendingClient]:
+        """Extrai dados de clientes pendentes com validação robusta."""
+        return list(self.iter_pending_clients())
+
+    def batch_requests(self, prepared: dict) -> Dict[str, dict]:
+        """Pedidos (chave do chunk -> params) dos chunks de um PDF preparado que ainda não estão em cache."""
+        if not prepared["fallback_pages"]:
+            return {}
+        requests = {}
+        with SecureText(prepared["fallback_pages"]) as text:
+            if not prepared["rows"] and not self.validate_extracted_text(text):
+                return {}
+            for chunk in self.iter_chunks(text):
+                cache_key = self._chunk_key(chunk.text)
+                if self.chunk_cache.get(cache_key) is None:
+                    requests[cache_key] = self._message_params(chunk.text)
+        return requests
+
+    def extract_prepared(self, prepared: dict, pdf_hash: str) -> List[PendingClient]:
+        """Conclui a extração de um PDF já lido por prepare_document (usado na ingestão em lote)."""
+        logger.info(f"Concluindo extração preparada: {self.pdf_path}")
+        self.from_cache = False
+        self.validator = ClientValidator()
+        self.deduplicator = ClientDeduplicator()
+        self.usage = Counter()
+        self.repair_stats = Counter()
+        self.skipped_chars = prepared.get("skipped_chars", 0)
+        self.extraction_complete = True
+        clients = self._to_pending_clients(prepared["rows"])
+        if prepared["fallback_pages"]:
+            text = SecureText(prepared["fallback_pages"])
+            clients.extend(self._iter_claude_stage(text, check_relevance=not clients))
+        self._finish_extraction(pdf_hash, clients)
         return clients
@@ -0,0 +1,40 @@
+import logging
+import os
+import threading
+
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_twilio_clients = {}
+_twilio_lock = threading.Lock()
+
+
+def create_pooled_http_client(pool_size: int = None, timeout: float = None) -> TwilioHttpClient:
+    """HTTP do Twilio com uma sessão keep-alive e até pool_size conexões abertas pro mesmo host."""
+    pool_size = pool_size or int(os.getenv("TWILIO_POOL_SIZE", "8"))  # Pelo menos SEND_CONCURRENCY
+    timeout = timeout or float(os.getenv("TWILIO_TIMEOUT_SECONDS", "30"))
+    http_client = TwilioHttpClient(pool_connections=True, timeout=timeout)
+    http_client.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    return http_client
+
+
+def get_twilio_client(account_sid: str = None, auth_token: str = None) -> Client:
+    """Retorna o Client do Twilio compartilhado pelo processo pra essas credenciais.
+
+    Todas as telas e sessões do Flet usam a mesma instância, então as conexões TLS com a API
+    ficam abertas e são reaproveitadas entre mensagens em vez de um handshake novo por Client.
+    """
+    account_sid = account_sid or os.getenv("TWILIO_ACCOUNT_SID")
+    auth_token = auth_token or os.getenv("TWILIO_AUTH_TOKEN")
+    key = (account_sid, auth_token)
+    with _twilio_lock:
+        if key not in _twilio_clients:
+            _twilio_clients[key] = Client(account_sid, auth_token, http_client=create_pooled_http_client())
+            logger.info("Client do Twilio criado com pool de conexões")
+        return _twilio_clients[key]
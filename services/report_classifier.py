@@ -0,0 +1,25 @@
+from typing import Iterable
+
+MAIN_KEYWORDS = ("inadimplente", "inadimplência", "atraso", "renegociado", "vencimento", "dívida", "pendente")
+FINANCIAL_KEYWORDS = ("valor", "pagamento", "cliente", "cpf", "cnpj", "telefone")
+
+
+class ReportClassifier:
+    """Decide se um texto é relatório de inadimplência: precisa de uma palavra principal e uma de contexto financeiro.
+
+    Lê página por página, deixa cada página em minúsculo uma única vez, só procura os grupos que
+    ainda faltam e para assim que os dois aparecem; num relatório isso costuma ser a primeira página.
+    """
+
+    def __init__(self, main_keywords: Iterable[str] = MAIN_KEYWORDS,
+                 financial_keywords: Iterable[str] = FINANCIAL_KEYWORDS):
+        self.keyword_groups = [tuple(k.lower() for k in main_keywords), tuple(k.lower() for k in financial_keywords)]
+
+    def is_report(self, pages: Iterable[str]) -> bool:
+        missing = list(self.keyword_groups)
+        for text in pages:
+            text = text.lower()
+            missing = [group for group in missing if not any(keyword in text for keyword in group)]
+            if not missing:
+                return True
+        return False
@@ -0,0 +1,96 @@
+import logging
+import re
+from typing import Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Protocolo compacto: um cabeçalho e uma linha por cliente, em vez de repetir os nomes dos campos no JSON
+ROW_FIELDS = ("id", "name", "debt_amount", "due_date", "status", "contact")
+ROW_DELIMITER = "|"
+ROWS_BLOCK_PATTERN = re.compile(r"```rows\s*(.*?)\s*```", re.DOTALL)
+
+
+def format_rows(records: Iterable[dict]) -> str:
+    """Serializa clientes no formato de linhas (o mesmo que o Claude devolve)."""
+    lines = [ROW_DELIMITER.join(ROW_FIELDS)]
+    for record in records:
+        lines.append(ROW_DELIMITER.join(str(record.get(name, "")).replace(ROW_DELIMITER, " ") for name in ROW_FIELDS))
+    return "\n".join(lines)
+
+
+class RowReader:
+    """Converte linhas do bloco em dicts no formato do JSON, uma por vez.
+
+    A primeira linha não vazia é o cabeçalho; colunas desconhecidas são ignoradas e linhas com
+    quantidade errada de células são descartadas.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.invalid = False  # Cabeçalho sem algum campo obrigatório: o resto do bloco é ignorado
+
+    def read_line(self, line: str) -> Optional[dict]:
+        line = line.strip()
+        if not line or self.invalid:
+            return None
+        cells = [cell.strip() for cell in line.split(ROW_DELIMITER)]
+        if self.columns is None:
+            self.columns = [cell.lower() for cell in cells]
+            if not set(ROW_FIELDS).issubset(self.columns):
+                logger.warning(f"Cabeçalho do protocolo de linhas incompleto: {self.columns}")
+                self.invalid = True
+            return None
+        if len(cells) != len(self.columns):
+            logger.debug(f"Linha descartada, {len(cells)} células para {len(self.columns)} colunas")
+            return None
+        record = {name: value for name, value in zip(self.columns, cells) if name in ROW_FIELDS}
+        try:
+            record["debt_amount"] = float(record["debt_amount"].replace("R$", "").replace(",", ".").strip())
+        except ValueError:
+            pass  # validate_record rejeita como valor_invalido
+        return record
+
+
+class RowStream:
+    """Versão incremental pra streaming: devolve cada cliente quando a quebra de linha chega."""
+
+    def __init__(self):
+        self._reader = RowReader()
+        self._pending = ""
+        self._inside = False
+        self._finished = False
+
+    def feed(self, delta: str) -> List[dict]:
+        """Consome mais um pedaço do texto e retorna as linhas completadas nele."""
+        records = []
+        self._pending += delta
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            if self._finished:
+                break
+            if line.strip().startswith("```"):
+                # Abre no ```rows e fecha no ``` seguinte
+                self._finished = self._inside
+                self._inside = not self._inside
+                continue
+            if self._inside:
+                record = self._reader.read_line(line)
+                if record is not None:
+                    records.append(record)
+        return records
+
+
+def iter_rows(lines: Iterable[str]) -> Iterator[dict]:
+    """Converte as linhas de um bloco em dicts, à medida que chegam."""
+    reader = RowReader()
+    for line in lines:
+        record = reader.read_line(line)
+        if reader.invalid:
+            return
+        if record is not None:
+            yield record
+
+
+def parse_rows(text: str) -> List[dict]:
+    """Lê um bloco de linhas completo."""
+    return list(iter_rows(text.splitlines()))
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterable, Tuple, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Limitador de taxa: rate fichas por segundo, acumulando até capacity pra rajadas curtas."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Bloqueia a thread até ter uma ficha disponível."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SendEngine:
+    """Envia itens com N requisições simultâneas, respeitando o limite de taxa do provedor.
+
+    Os envios (HTTP síncrono do Twilio) rodam num pool de threads; quem consome só faz await no
+    loop do Flet, que continua livre pra atualizar a tela.
+    """
+
+    def __init__(self, send: Callable[[T], bool], rate: float = None, burst: int = None, concurrency: int = None):
+        self.send = send
+        self.rate = rate or float(os.getenv("SEND_RATE_PER_SECOND", "1"))  # Taxa liberada pelo provedor
+        self.burst = burst or int(os.getenv("SEND_BURST", "5"))
+        self.concurrency = concurrency or int(os.getenv("SEND_CONCURRENCY", "4"))  # Requisições em voo
+        self.bucket = TokenBucket(self.rate, self.burst)
+
+    def _send_limited(self, item: T) -> bool:
+        self.bucket.acquire()
+        try:
+            return bool(self.send(item))
+        except Exception as e:
+            logger.error(f"Erro inesperado no envio: {e}")
+            return False
+
+    async def run(self, items: Iterable[T]) -> AsyncIterator[Tuple[T, bool]]:
+        """Gera (item, sucesso) na ordem em que os envios terminam."""
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max(1, self.concurrency))
+        pending = {}
+        try:
+            for item in items:
+                pending[loop.run_in_executor(executor, self._send_limited, item)] = item
+            logger.info(f"Enviando {len(pending)} mensagens a {self.rate}/s com {self.concurrency} simultâneas")
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            # Se o consumidor parar no meio, os envios ainda não iniciados são descartados
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,195 @@
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rótulos de coluna aceitos pra cada campo esperado por validate_client_data
+HEADER_ALIASES = {
+    "id": ("cpf", "cnpj", "documento", "doc"),
+    "name": ("nome", "cliente", "devedor"),
+    "debt_amount": ("valor", "dívida", "divida", "débito", "debito", "saldo"),
+    "due_date": ("vencimento", "venc", "data"),
+    "status": ("status", "situação", "situacao"),
+    "contact": ("telefone", "contato", "celular", "fone"),
+}
+REQUIRED_FIELDS = {"name", "debt_amount", "due_date", "status", "contact"}
+
+DATE_PATTERN = re.compile(r"\d{2}/\d{2}/\d{4}")
+AMOUNT_PATTERN = re.compile(r"-?\d{1,3}(?:\.\d{3})*(?:,\d{1,2})?|-?\d+(?:[.,]\d{1,2})?")
+NON_DIGIT_PATTERN = re.compile(r"\D")
+
+
+def match_header(label: str) -> Optional[str]:
+    """Retorna o campo correspondente ao rótulo de coluna, se houver."""
+    label = label.strip().lower()
+    if not label:
+        return None
+    for field, aliases in HEADER_ALIASES.items():
+        if any(label.startswith(alias) for alias in aliases):
+            return field
+    return None
+
+
+def map_header(cells: List[str]) -> Optional[Dict[str, int]]:
+    """Mapeia campo -> índice de coluna; None se faltar algum campo obrigatório."""
+    mapping = {}
+    for idx, cell in enumerate(cells):
+        field = match_header(cell or "")
+        if field and field not in mapping:
+            mapping[field] = idx
+    return mapping if REQUIRED_FIELDS.issubset(mapping) else None
+
+
+def parse_amount(value: str) -> Optional[float]:
+    """Converte valores no formato brasileiro (R$ 1.234,56) pra float."""
+    match = AMOUNT_PATTERN.search((value or "").replace("R$", "").replace(" ", ""))
+    if not match:
+        return None
+    number = match.group(0)
+    if "," in number:
+        number = number.replace(".", "").replace(",", ".")
+    elif number.count(".") > 1 or re.search(r"\.\d{3}$", number):
+        number = number.replace(".", "")
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def group_lines(words: list) -> List[list]:
+    """Agrupa palavras (page.get_text("words")) em linhas visuais pela posição vertical."""
+    lines = []
+    for word in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        center = (word[1] + word[3]) / 2
+        if lines and abs(center - lines[-1][0]) <= (word[3] - word[1]) / 2:
+            lines[-1][1].append(word)
+        else:
+            lines.append([center, [word]])
+    return [sorted(line, key=lambda w: w[0]) for _, line in lines]
+
+
+def split_cells(line: list) -> List[Tuple[float, float, str]]:
+    """Junta palavras próximas em células, separando onde há espaço de coluna."""
+    cells = []
+    for word in line:
+        gap_limit = (word[3] - word[1]) * 0.8
+        if cells and word[0] - cells[-1][1] <= gap_limit:
+            x0, _, text = cells[-1]
+            cells[-1] = (x0, word[2], f"{text} {word[4]}")
+        else:
+            cells.append((word[0], word[2], word[4]))
+    return cells
+
+
+class LocalTableParser:
+    """Extrai tabelas de clientes direto da geometria do PDF, sem chamar o Claude."""
+
+    def __init__(self, min_confidence: float = 0.9):
+        self.min_confidence = min_confidence
+        self.temp_counter = 0
+        self._carried_mapping = None  # Cabeçalho da página anterior pra tabelas que continuam
+        self._carried_columns = None
+
+    def parse_page(self, page) -> Optional[List[dict]]:
+        """Retorna as linhas da página ou None se não der pra confiar no resultado."""
+        for parse in (self._parse_with_find_tables, self._parse_with_words):
+            try:
+                rows = parse(page)
+            except Exception as e:
+                logger.debug(f"Parser local falhou na página {page.number}: {e}")
+                rows = None
+            if rows is not None:
+                return rows
+        return None
+
+    def _parse_with_find_tables(self, page) -> Optional[List[dict]]:
+        if not hasattr(page, "find_tables"):
+            return None
+        tables = page.find_tables().tables
+        if not tables:
+            return None
+
+        rows = []
+        for table in tables:
+            cells = table.extract()
+            if not cells:
+                continue
+            mapping = map_header(cells[0])
+            if mapping:
+                data = cells[1:]
+                self._carried_mapping, self._carried_columns = mapping, None
+            elif self._carried_mapping and len(cells[0]) > max(self._carried_mapping.values()):
+                mapping, data = self._carried_mapping, cells
+            else:
+                return None
+            table_rows = self._rows_from_cells(data, mapping)
+            if table_rows is None:
+                return None
+            rows.extend(table_rows)
+        return rows
+
+    def _parse_with_words(self, page) -> Optional[List[dict]]:
+        lines = group_lines(page.get_text("words"))
+        columns, mapping, start = None, None, 0
+        for idx, line in enumerate(lines):
+            cells = split_cells(line)
+            candidate = map_header([text for _, _, text in cells])
+            if candidate:
+                columns = [(x0, x1) for x0, x1, _ in cells]
+                mapping, start = candidate, idx + 1
+                self._carried_mapping, self._carried_columns = mapping, columns
+                break
+        if mapping is None:
+            if not (self._carried_mapping and self._carried_columns):
+                return None
+            mapping, columns = self._carried_mapping, self._carried_columns
+
+        # Fronteiras entre colunas no meio do espaço entre cabeçalhos, pra aceitar texto alinhado à direita
+        bounds = [(columns[i][1] + columns[i + 1][0]) / 2 for i in range(len(columns) - 1)]
+        data = []
+        for line in lines[start:]:
+            row = [""] * len(columns)
+            for word in line:
+                center = (word[0] + word[2]) / 2
+                col = sum(1 for b in bounds if center > b)
+                row[col] = f"{row[col]} {word[4]}".strip()
+            data.append(row)
+        return self._rows_from_cells(data, mapping)
+
+    def _rows_from_cells(self, data: List[list], mapping: Dict[str, int]) -> Optional[List[dict]]:
+        rows = []
+        candidates = 0
+        for cells in data:
+            values = {field: str(cells[idx] or "").replace("\n", " ").strip() if idx < len(cells) else ""
+                      for field, idx in mapping.items()}
+            # Linhas com poucas colunas preenchidas são rodapé, total ou título, não dado
+            if sum(1 for v in values.values() if v) < 3:
+                continue
+            candidates += 1
+            row = self._build_row(values)
+            if row:
+                rows.append(row)
+        if not candidates or len(rows) / candidates < self.min_confidence:
+            return None
+        return rows
+
+    def _build_row(self, values: Dict[str, str]) -> Optional[dict]:
+        amount = parse_amount(values["debt_amount"])
+        contact_digits = NON_DIGIT_PATTERN.sub("", values["contact"])
+        if not values["name"] or amount is None or not 10 <= len(contact_digits) <= 11:
+            return None
+
+        id_digits = NON_DIGIT_PATTERN.sub("", values.get("id", ""))
+        if not id_digits:
+            self.temp_counter += 1
+            id_digits = f"TEMP_{self.temp_counter:03d}"
+        date_match = DATE_PATTERN.search(values["due_date"])
+        return {
+            "id": id_digits,
+            "name": values["name"],
+            "debt_amount": amount,
+            "due_date": date_match.group(0) if date_match else "PENDENTE",
+            "status": values["status"],
+            "contact": contact_digits,
+        }
@@ -0,0 +1,54 @@
+from typing import List
+
+CLIENT_FIELDS = ("id", "name", "debt_amount", "due_date", "status", "contact")
+
+# Ferramenta que o Claude é obrigado a chamar no modo de extração estruturada
+CLIENTS_TOOL = {
+    "name": "record_clients",
+    "description": "Record every pending client found in the report excerpt.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "clients": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "string"},
+                        "name": {"type": "string"},
+                        "debt_amount": {"type": "number"},
+                        "due_date": {"type": "string"},
+                        "status": {"type": "string"},
+                        "contact": {"type": "string"},
+                    },
+                    "required": list(CLIENT_FIELDS),
+                },
+            },
+        },
+        "required": ["clients"],
+    },
+}
+MAX_REPORTED_ERRORS = 10  # O pedido de reparo lista só os primeiros problemas
+
+
+def schema_errors(tool_input) -> List[str]:
+    """Confere localmente a entrada da ferramenta contra CLIENTS_TOOL; lista vazia se estiver tudo certo."""
+    if not isinstance(tool_input, dict) or not isinstance(tool_input.get("clients"), list):
+        return ["input must be an object with a 'clients' array"]
+    errors = []
+    for index, client in enumerate(tool_input["clients"]):
+        if not isinstance(client, dict):
+            errors.append(f"clients[{index}] must be an object")
+            continue
+        missing = [name for name in CLIENT_FIELDS if name not in client]
+        if missing:
+            errors.append(f"clients[{index}] is missing {', '.join(missing)}")
+        amount = client.get("debt_amount")
+        if "debt_amount" in client and (isinstance(amount, bool) or not isinstance(amount, (int, float))):
+            errors.append(f"clients[{index}].debt_amount must be a number, got {amount!r}")
+        for name in ("id", "name", "due_date", "status", "contact"):
+            if name in client and not isinstance(client[name], str):
+                errors.append(f"clients[{index}].{name} must be a string")
+        if len(errors) >= MAX_REPORTED_ERRORS:
+            break
+    return errors[:MAX_REPORTED_ERRORS]
@@ -6,7 +6,8 @@ from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import pytz
 import flet as ft
-from flet.security import decrypt
+
+from utils.crypto import decrypt
 
 load_dotenv()
 
@@ -0,0 +1,75 @@
+import base64
+import os
+import threading
+from functools import lru_cache
+from typing import Iterable, List
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Mesmos parâmetros do flet.security, pra manter compatibilidade com os dados já gravados
+SALT_SIZE = 16
+KDF_ITERATIONS = 600000
+
+
+@lru_cache(maxsize=512)
+def _derive_fernet(secret_key: str, salt: bytes) -> Fernet:
+    """Deriva (uma vez por segredo + salt) a chave Fernet; o PBKDF2 é a parte cara."""
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=KDF_ITERATIONS)
+    return Fernet(base64.urlsafe_b64encode(kdf.derive(secret_key.encode("utf-8"))))
+
+
+class CryptoService:
+    """Encrypt/decrypt no formato do flet.security com a chave derivada em cache.
+
+    Na criptografia usa um salt fixo por processo, então o PBKDF2 roda uma única vez; o Fernet
+    continua gerando IV aleatório por mensagem. Na descriptografia a chave fica em cache por salt.
+    """
+
+    def __init__(self, secret_key: str = None):
+        self.secret_key = secret_key or os.getenv("MY_APP_SECRET_KEY")
+        if not self.secret_key:
+            raise ValueError("MY_APP_SECRET_KEY é obrigatório pra criptografia. Verifique o arquivo .env.")
+        self._salt = os.urandom(SALT_SIZE)
+
+    def encrypt(self, plain_text: str) -> str:
+        fernet = _derive_fernet(self.secret_key, self._salt)
+        return base64.urlsafe_b64encode(self._salt + fernet.encrypt(plain_text.encode("utf-8"))).decode()
+
+    def decrypt(self, encrypted_data: str) -> str:
+        data = base64.urlsafe_b64decode(encrypted_data)
+        fernet = _derive_fernet(self.secret_key, data[:SALT_SIZE])
+        return fernet.decrypt(data[SALT_SIZE:]).decode("utf-8")
+
+    def encrypt_many(self, plain_texts: Iterable[str]) -> List[str]:
+        return [self.encrypt(text) for text in plain_texts]
+
+    def decrypt_many(self, encrypted_items: Iterable[str]) -> List[str]:
+        return [self.decrypt(item) for item in encrypted_items]
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_crypto_service(secret_key: str = None) -> CryptoService:
+    """Retorna o serviço compartilhado pelo processo pra esse segredo (padrão: MY_APP_SECRET_KEY)."""
+    secret_key = secret_key or os.getenv("MY_APP_SECRET_KEY")
+    with _services_lock:
+        if secret_key not in _services:
+            _services[secret_key] = CryptoService(secret_key)
+        return _services[secret_key]
+
+
+def encrypt(plain_text: str, secret_key: str = None) -> str:
+    """Substituto direto de flet.security.encrypt."""
+    return get_crypto_service(secret_key).encrypt(plain_text)
+
+
+def decrypt(encrypted_data: str, secret_key: str = None) -> str:
+    """Substituto direto de flet.security.decrypt."""
+    return get_crypto_service(secret_key).decrypt(encrypted_data)
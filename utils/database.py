@@ -1,7 +1,6 @@
 from datetime import datetime
 from typing import List, NamedTuple
 import os
-from flet.security import encrypt, decrypt
 
 
 class Notification(NamedTuple):
@@ -15,8 +14,6 @@ notification_history = {}
 
 
 def save_notification(client_name: str, message: str, status: str):
-    secret_key = os.getenv("MY_APP_SECRET_KEY")
-    encrypted_contact = encrypt(client_name, secret_key)
     if client_name not in notification_history:
         notification_history[client_name] = []
     notification_history[client_name].append(Notification(
@@ -27,8 +24,6 @@ def save_notification(client_name: str, message: str, status: str):
 
 
 def add_notification(client_name: str, message: str, status: str, sid: str = None):
-    secret_key = os.getenv("MY_APP_SECRET_KEY")
-    encrypted_contact = encrypt(client_name, secret_key)
     if client_name not in notification_history:
         notification_history[client_name] = []
     notification_history[client_name].append(Notification(
@@ -0,0 +1,182 @@
+"""Servidor local que imita a Message Batches API, pra testar o modo em lote sem rede.
+
+Uso: python -m utils.local_batch_server [porta]
+Depois rode o app com ANTHROPIC_BASE_URL=http://127.0.0.1:<porta> e MESSAGE_BATCH_MODE=1.
+
+As respostas são geradas pelo parser local de tabelas a partir do texto do chunk, no formato
+(json, rows ou chamada de ferramenta) pedido.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional, Tuple
+
+from services.chunker import CELL_SEPARATOR
+from services.row_protocol import format_rows
+from services.table_parser import LocalTableParser, map_header
+
+logger = logging.getLogger(__name__)
+
+
+def table_responder(params: dict) -> List[dict]:
+    """Extrai as linhas do chunk com o parser local, no lugar do Claude."""
+    chunk = params["messages"][0]["content"]
+    parser = LocalTableParser(min_confidence=0)
+    mapping, data = None, []
+    for line in chunk.splitlines():
+        cells = line.split(CELL_SEPARATOR)
+        candidate = map_header(cells)
+        if candidate:
+            mapping = candidate
+        elif mapping:
+            data.append(cells)
+    return (parser._rows_from_cells(data, mapping) or []) if mapping else []
+
+
+def response_content(params: dict, rows: List[dict]) -> Tuple[List[dict], str]:
+    """Monta o content e o stop_reason da resposta no formato que o pedido espera."""
+    if params.get("tools"):
+        tool_use = {"type": "tool_use", "id": f"toolu_local_{uuid.uuid4().hex[:16]}",
+                    "name": params["tools"][0]["name"], "input": {"clients": rows}}
+        return [tool_use], "tool_use"
+    system = "".join(block["text"] for block in params.get("system", []))
+    if "```rows" in system:
+        text = f"```rows\n{format_rows(rows)}\n```"
+    else:
+        text = f"```json\n{json.dumps(rows, ensure_ascii=False)}\n```"
+    return [{"type": "text", "text": text}], "end_turn"
+
+
+class LocalBatchServer:
+    """Implementa create/retrieve/results/cancel de /v1/messages/batches em memória.
+
+    Cada batch fica "in_progress" por processing_seconds antes de terminar, pra exercitar o polling.
+    """
+
+    def __init__(self, port: int = 0, responder: Optional[Callable[[dict], List[dict]]] = None,
+                 processing_seconds: float = 0.5):
+        self.responder = responder or table_responder
+        self.processing_seconds = processing_seconds
+        self.batches = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self) -> "LocalBatchServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Servidor local de Message Batches em {self.base_url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _create(self, body: dict) -> dict:
+        batch_id = f"msgbatch_local_{uuid.uuid4().hex[:16]}"
+        results = []
+        for item in body["requests"]:
+            params = item["params"]
+            content, stop_reason = response_content(params, self.responder(params))
+            results.append({"custom_id": item["custom_id"], "result": {"type": "succeeded", "message": {
+                "id": f"msg_local_{uuid.uuid4().hex[:16]}",
+                "type": "message",
+                "role": "assistant",
+                "model": params["model"],
+                "content": content,
+                "stop_reason": stop_reason,
+                "stop_sequence": None,
+                "usage": {"input_tokens": len(params["messages"][0]["content"]) // 4,
+                          "output_tokens": len(json.dumps(content)) // 4},
+            }}})
+        with self._lock:
+            self.batches[batch_id] = {"created": time.time(), "results": results, "canceled": False}
+        return self._describe(batch_id)
+
+    def _describe(self, batch_id: str) -> dict:
+        batch = self.batches[batch_id]
+        created = datetime.fromtimestamp(batch["created"], timezone.utc)
+        ended = batch["canceled"] or time.time() - batch["created"] >= self.processing_seconds
+        total = len(batch["results"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0 if ended else total, "succeeded": total if ended else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": created.isoformat(),
+            "expires_at": (created + timedelta(hours=24)).isoformat(),
+            "ended_at": datetime.now(timezone.utc).isoformat() if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{self.base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, payload, content_type: str = "application/json"):
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _batch_id(self) -> Optional[str]:
+                parts = self.path.split("?")[0].strip("/").split("/")
+                batch_id = parts[3] if len(parts) > 3 else None
+                return batch_id if batch_id in server.batches else None
+
+            def do_POST(self):
+                path = self.path.split("?")[0].rstrip("/")
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if path == "/v1/messages/batches":
+                    return self._send(200, server._create(body))
+                batch_id = self._batch_id()
+                if batch_id and path.endswith("/cancel"):
+                    server.batches[batch_id]["canceled"] = True
+                    return self._send(200, server._describe(batch_id))
+                self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+            def do_GET(self):
+                batch_id = self._batch_id()
+                if not batch_id:
+                    return self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+                if self.path.split("?")[0].rstrip("/").endswith("/results"):
+                    lines = "\n".join(json.dumps(r, ensure_ascii=False) for r in server.batches[batch_id]["results"])
+                    return self._send(200, lines.encode("utf-8"), "application/binary")
+                self._send(200, server._describe(batch_id))
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    with LocalBatchServer(port) as local_server:
+        print(f"Use ANTHROPIC_BASE_URL={local_server.base_url} MESSAGE_BATCH_MODE=1")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
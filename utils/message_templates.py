@@ -1,3 +1,103 @@
+from functools import lru_cache
+from string import Formatter
+from typing import Iterable, List
+
+TEMPLATE_FIELDS = ("name", "debt_amount", "due_date", "reason")
+DEFAULT_REASON = "pendência"
+
+
+class TemplateError(ValueError):
+    """Modelo com placeholder inválido ou clientes sem os campos que o modelo usa."""
+
+
+class CompiledTemplate:
+    """Modelo analisado uma única vez: placeholders conferidos e texto quebrado em partes fixas e campos.
+
+    Renderizar é só juntar as partes; o resultado fica em cache pelos valores dos campos usados,
+    então o mesmo cliente (ou outro com os mesmos dados) não é formatado duas vezes.
+    """
+
+    def __init__(self, text: str, cache_size: int = 4096):
+        if not isinstance(text, str) or not text.strip():
+            raise TemplateError("Modelo de mensagem vazio.")
+        self.text = text
+        self._parts = []
+        unknown = []
+        try:
+            for literal, field, spec, conversion in Formatter().parse(text):
+                if field is None:
+                    self._parts.append((literal, None, None, None))
+                    continue
+                if field not in TEMPLATE_FIELDS:
+                    unknown.append("{" + field + "}")
+                if spec and ("{" in spec or "}" in spec):
+                    raise ValueError(f"formato aninhado em {{{field}}}")
+                if conversion not in (None, "r", "s", "a"):
+                    raise ValueError(f"conversão !{conversion} inválida em {{{field}}}")
+                self._parts.append((literal, field, conversion, spec))
+        except ValueError as e:
+            raise TemplateError(f"Modelo inválido: {e}") from e
+        if unknown:
+            raise TemplateError(f"Campos desconhecidos no modelo: {', '.join(unknown)}. "
+                                f"Use apenas {', '.join('{' + f + '}' for f in TEMPLATE_FIELDS)}.")
+        self.fields = tuple(dict.fromkeys(part[1] for part in self._parts if part[1]))
+        self._render_values = lru_cache(maxsize=cache_size)(self._join)
+        # Formatos como {debt_amount:d} passam na análise mas quebram com os valores reais (texto)
+        self.render_values(tuple("exemplo" for _ in self.fields))
+
+    @staticmethod
+    def client_values(client) -> dict:
+        return {
+            "name": client.name,
+            "debt_amount": client.debt_amount,
+            "due_date": client.due_date,
+            "reason": getattr(client, "reason", None) or DEFAULT_REASON,
+        }
+
+    def missing_fields(self, client) -> List[str]:
+        """Campos usados pelo modelo que o cliente não tem preenchidos."""
+        values = self.client_values(client)
+        return [field for field in self.fields if values[field] is None or str(values[field]).strip() == ""]
+
+    def render(self, client) -> str:
+        values = self.client_values(client)
+        return self.render_values(tuple(values[field] for field in self.fields))
+
+    def render_values(self, values: tuple) -> str:
+        """Renderiza a partir dos valores de self.fields, na mesma ordem."""
+        try:
+            return self._render_values(values)
+        except (ValueError, TypeError) as e:
+            raise TemplateError(f"Modelo inválido: {e}") from e
+
+    def render_many(self, clients: Iterable) -> List[str]:
+        """Renderiza a lista toda; se faltar campo em algum cliente, avisa de todos antes de gerar qualquer mensagem."""
+        clients = list(clients)
+        problems = [(client, missing) for client in clients for missing in [self.missing_fields(client)] if missing]
+        if problems:
+            details = "; ".join(f"{client.name}: {', '.join(missing)}" for client, missing in problems[:5])
+            raise TemplateError(f"{len(problems)} clientes sem os campos do modelo ({details})")
+        return [self.render(client) for client in clients]
+
+    def _join(self, values: tuple) -> str:
+        by_field = dict(zip(self.fields, values))
+        out = []
+        for literal, field, conversion, spec in self._parts:
+            out.append(literal)
+            if field:
+                value = by_field[field]
+                if conversion:
+                    value = {"r": repr, "s": str, "a": ascii}[conversion](value)
+                out.append(format(value, spec or ""))
+        return "".join(out)
+
+
+@lru_cache(maxsize=64)
+def compile_template(text: str) -> CompiledTemplate:
+    """Compila (uma vez por texto) o modelo; levanta TemplateError se tiver placeholder inválido."""
+    return CompiledTemplate(text)
+
+
 class MessageTemplates:
     """Gerencia modelos de mensagens para notificações."""
 
@@ -19,6 +119,14 @@ class MessageTemplates:
         """Retorna o modelo de mensagem especificado ou o selecionado."""
         return self.templates.get(name or self.selected_template, self.templates["Padrão"])
 
+    def compiled(self, name=None) -> CompiledTemplate:
+        """Retorna o modelo especificado ou o selecionado já compilado."""
+        return compile_template(self.get_template(name))
+
+    def render(self, client, name=None) -> str:
+        """Mensagem do modelo especificado ou do selecionado pra esse cliente."""
+        return self.compiled(name).render(client)
+
     def set_template(self, name):
         """Define o modelo de mensagem selecionado."""
         if name in self.templates:
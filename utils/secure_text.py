@@ -0,0 +1,48 @@
+from typing import Iterable, Iterator, List, Tuple
+
+from utils.crypto import encrypt
+
+
+class SecureText:
+    """Texto de um relatório mantido só em memória durante uma extração.
+
+    Guarda as páginas em bytearray pra poder zerar o conteúdo no fim (clear ou bloco with)
+    e só criptografa quando algo realmente vai ser persistido.
+    """
+
+    def __init__(self, pages: Iterable[Tuple[int, str]]):
+        self._pages: List[Tuple[int, bytearray]] = [(number, bytearray(text.encode("utf-8"))) for number, text in pages]
+
+    def pages(self) -> Iterator[Tuple[int, str]]:
+        """Gera (número da página, texto) sem montar o documento inteiro."""
+        for number, data in self._pages:
+            yield number, data.decode("utf-8")
+
+    def text(self, separator: str = "\n") -> str:
+        return separator.join(text for _, text in self.pages())
+
+    def encrypt(self, secret_key: str, separator: str = "\n") -> str:
+        """Criptografa o conteúdo pra persistência (único ponto onde o texto sai da memória)."""
+        return encrypt(self.text(separator), secret_key)
+
+    def clear(self) -> None:
+        """Zera os buffers e descarta as páginas."""
+        for _, data in self._pages:
+            data[:] = b"\x00" * len(data)
+        self._pages = []
+
+    def __len__(self) -> int:
+        return sum(len(data) for _, data in self._pages)
+
+    def __bool__(self) -> bool:
+        return any(data.strip() for _, data in self._pages)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.clear()
+
+    def __repr__(self) -> str:
+        # Nunca expõe o conteúdo em logs
+        return f"<SecureText {len(self._pages)} páginas, {len(self)} bytes>"
@@ -0,0 +1,22 @@
+import os
+import sqlite3
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def data_path(*parts: str) -> str:
+    """Caminho dentro da pasta de dados do app (FLET_APP_STORAGE_DATA, ou storage/data fora do Flet)."""
+    base_dir = os.getenv("FLET_APP_STORAGE_DATA") or os.path.join("storage", "data")
+    return os.path.join(base_dir, *parts)
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """Abre o SQLite em WAL e em autocommit, pra ser usado por várias threads com transações explícitas."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # Com WAL, fsync só no checkpoint
+    conn.execute("PRAGMA busy_timeout=5000")  # Espera o lock de outro processo em vez de falhar na hora
+    return conn
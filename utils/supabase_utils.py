@@ -3,7 +3,8 @@ from dotenv import load_dotenv
 import logging
 import flet as ft
 from supabase import create_client, Client
-from flet.security import decrypt
+
+from utils.crypto import decrypt
 
 load_dotenv()
 logger = logging.getLogger(__name__)